@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def get_user_cache():
+    return caches[settings.AUTH_USER_CACHE['ALIAS']]
+
+
+def user_cache_key(user_id) -> str:
+    return f'accounts:user:{user_id}'
+
+
+# Поля пользователя, сохраняемые в кэше. Хеш пароля в кэш не попадает: для проверки отзыва токена
+# хранится только его md5 отпечаток, который и так передается в самом токене
+USER_CACHE_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def cached_user_data(user) -> dict:
+    data = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+    if api_settings.CHECK_REVOKE_TOKEN:
+        data['revoke'] = get_md5_hash_password(user.password)
+    return data
+
+
+# Пользователь из полей кэша, без пароля и запроса к БД
+def user_from_cache(data: dict):
+    user = get_user_model()(**{field: data[field] for field in USER_CACHE_FIELDS})
+    user._state.adding = False
+    return user
+
+
+# JWT аутентификация с кэшированием пользователя по id из токена.
+# Пользователь загружается из БД только при промахе кэша, проверки активности и смены пароля
+# выполняются на каждый запрос по закэшированным полям. Кэш сбрасывается при любом сохранении
+# или удалении пользователя
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = get_user_cache()
+        data = cache.get(user_cache_key(user_id))
+        if data is None:
+            user = super().get_user(validated_token)
+            cache.set(user_cache_key(user_id), cached_user_data(user), settings.AUTH_USER_CACHE['TTL'])
+            return user
+
+        if not data['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != data.get('revoke'):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user_from_cache(data)
@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+VERSION_KEY = 'accounts:blacklist:version'
+
+
+def get_blacklist_cache():
+    return caches[settings.TOKEN_BLACKLIST['ALIAS']]
+
+
+# Множество в памяти можно использовать, только если ключ версии виден всем процессам.
+# Кэш в памяти процесса (LocMemCache) не сообщит другим процессам об отзыве токена
+def is_shared_cache() -> bool:
+    return not isinstance(get_blacklist_cache(), (LocMemCache, DummyCache))
+
+
+# Множество jti отозванных токенов в памяти процесса, позволяющее проверять refresh токены без запроса к БД.
+# Общий для процессов ключ версии увеличивается при каждом отзыве токена: при его изменении процесс
+# догружает записи blacklist, добавленные после предыдущей загрузки, с запасом OVERLAP секунд на транзакции,
+# зафиксированные позже своего времени отзыва. Раз в MAX_AGE секунд множество загружается полностью,
+# чтобы отбросить истекшие и удаленные при очистке токены
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = set()
+        self._loaded_since = None
+        self._version = None
+        self._loaded_at = 0
+
+    def _current_version(self):
+        cache = get_blacklist_cache()
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _refresh(self):
+        version = self._current_version()
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > settings.TOKEN_BLACKLIST['MAX_AGE']
+            if not expired and version == self._version:
+                return
+            now = aware_utcnow()
+            rows = BlacklistedToken.objects.all()
+            if expired:
+                rows = rows.filter(token__expires_at__gt=now)
+                self._jtis = set()
+                self._loaded_at = time.monotonic()
+            else:
+                overlap = timedelta(seconds=settings.TOKEN_BLACKLIST['OVERLAP'])
+                rows = rows.filter(blacklisted_at__gte=self._loaded_since - overlap)
+            self._jtis.update(rows.values_list('token__jti', flat=True))
+            self._loaded_since = now
+            self._version = version
+
+    def contains(self, jti: str) -> bool:
+        self._refresh()
+        return jti in self._jtis
+
+    # Добавление отозванного токена: сразу в множество процесса, а для остальных процессов
+    # через изменение версии после фиксации транзакции
+    def add(self, jti: str):
+        with self._lock:
+            self._jtis.add(jti)
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        cache = get_blacklist_cache()
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+            return
+        with self._lock:
+            # Если других отзывов с момента загрузки не было, процессу догружать нечего
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._jtis = set()
+            self._loaded_since = None
+            self._version = None
+            self._loaded_at = 0
+
+
+blacklist_filter = BlacklistFilter()
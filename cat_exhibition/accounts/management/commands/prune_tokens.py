@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+# Удаление истекших выданных токенов пачками (отозванные удаляются вместе с ними каскадно).
+# Короткие транзакции не блокируют таблицы надолго, команду можно запускать по расписанию (cron)
+class Command(BaseCommand):
+    help = 'Удаление истекших выданных и отозванных JWT токенов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество токенов в пачке')
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        pruned = 0
+        while True:
+            with transaction.atomic():
+                ids = list(OutstandingToken.objects.filter(expires_at__lte=now)
+                           .order_by('id')
+                           .values_list('id', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            pruned += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'Удалено токенов: {pruned}'))
@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+# Описание JWT аутентификации с кэшированием пользователя в OpenAPI схеме (та же схема Bearer, что и у simplejwt)
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = 'accounts.authentication.CachedJWTAuthentication'
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+
+from .tokens import RefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -27,3 +30,8 @@ class LogOutResponseSerializer(serializers.Serializer):
 
 class AuthResponseErrorSerializer(serializers.Serializer):
     error = serializers.CharField(default='Неверные данные')
+
+
+# Обновление токенов с проверкой отзыва через множество в памяти процесса
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
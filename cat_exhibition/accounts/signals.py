@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import get_user_cache, user_cache_key
+
+
+# Сброс кэша пользователя при изменении (смена пароля, деактивация) или удалении
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    get_user_cache().delete(user_cache_key(instance.pk))
@@ -0,0 +1,21 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt import tokens
+
+from .blacklist import blacklist_filter, is_shared_cache
+
+
+# Refresh токен с проверкой отзыва по множеству jti в памяти процесса вместо запроса к БД.
+# Без общего для процессов кэша проверка выполняется стандартным запросом к БД
+class RefreshToken(tokens.RefreshToken):
+    def check_blacklist(self):
+        if not is_shared_cache():
+            return super().check_blacklist()
+        if blacklist_filter.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
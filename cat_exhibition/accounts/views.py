@@ -3,11 +3,11 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 
 from .serializers import UserSerializer, LogOutSerializer, LogOutResponseSerializer, AuthResponseErrorSerializer, \
     SignUpResponseSerializer
+from .tokens import RefreshToken
 
 
 # Регистрация нового пользователя с присваиванием и возвращением ему JWT токена
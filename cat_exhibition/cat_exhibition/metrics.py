@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, Http404
+from django.utils.crypto import constant_time_compare
+
+from show.cache import get_stats
+
+
+# Счетчики SQL запросов одного HTTP запроса, заполняются оберткой выполнения запросов БД
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+# Гистограмма в формате Prometheus: количество наблюдений по верхним границам корзин, сумма и общее количество
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Метрики процесса по маршрутам (имени view и HTTP методу): длительность запросов, количество и время
+# SQL запросов, размер ответов и количество ответов по статусам
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: tuple, status_code: int, duration: float, queries: QueryCounter, size: int):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = {
+                    'duration': Histogram(settings.METRICS['LATENCY_BUCKETS']),
+                    'queries': Histogram(settings.METRICS['QUERY_BUCKETS']),
+                    'sql_seconds': 0.0,
+                    'response_bytes': 0,
+                    'statuses': {},
+                }
+            metrics['duration'].observe(duration)
+            metrics['queries'].observe(queries.count)
+            metrics['sql_seconds'] += queries.duration
+            metrics['response_bytes'] += size
+            metrics['statuses'][status_code] = metrics['statuses'].get(status_code, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._routes = {}
+
+    # Метрики в текстовом формате Prometheus, включая попадания и промахи кэша ответов
+    def render(self) -> str:
+        lines = []
+
+        def header(name, kind, description):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, key, description):
+            header(name, 'histogram', description)
+            for labels, metrics in routes:
+                data = metrics[key]
+                cumulative = 0
+                for bound, count in zip([*data.buckets, '+Inf'], data.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {data.sum}')
+                lines.append(f'{name}_count{{{labels}}} {data.count}')
+
+        with self._lock:
+            routes = [(f'route="{route}",method="{method}"', metrics)
+                      for (route, method), metrics in sorted(self._routes.items())]
+
+            header('http_requests_total', 'counter', 'Количество HTTP запросов по статусам ответа')
+            for labels, metrics in routes:
+                for status_code, count in sorted(metrics['statuses'].items()):
+                    lines.append(f'http_requests_total{{{labels},status="{status_code}"}} {count}')
+            histogram('http_request_duration_seconds', 'duration', 'Длительность обработки HTTP запроса')
+            histogram('db_queries_per_request', 'queries', 'Количество SQL запросов на HTTP запрос')
+            header('db_query_duration_seconds_total', 'counter', 'Суммарное время выполнения SQL запросов')
+            for labels, metrics in routes:
+                lines.append(f'db_query_duration_seconds_total{{{labels}}} {metrics["sql_seconds"]}')
+            header('http_response_size_bytes_total', 'counter', 'Суммарный размер тел ответов')
+            for labels, metrics in routes:
+                lines.append(f'http_response_size_bytes_total{{{labels}}} {metrics["response_bytes"]}')
+
+        stats = sorted(get_stats().items())
+        for counter, title in (('hits', 'попаданий'), ('misses', 'промахов')):
+            header(f'cache_{counter}_total', 'counter', f'Количество {title} кэша ответов по endpoint')
+            for endpoint, counters in stats:
+                lines.append(f'cache_{counter}_total{{endpoint="{endpoint}"}} {counters[counter]}')
+        header('cache_hit_ratio', 'gauge', 'Доля попаданий кэша ответов по endpoint')
+        for endpoint, counters in stats:
+            lines.append(f'cache_hit_ratio{{endpoint="{endpoint}"}} {counters["hit_rate"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# Сбор метрик запросов. При METRICS_ENABLED=False middleware исключается из цепочки при запуске
+# и не добавляет накладных расходов
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.record((route, request.method), response.status_code, duration, queries, size)
+        return response
+
+
+# Служебные endpoint доступны по заголовку Authorization: Bearer <METRICS_TOKEN> или сотрудникам,
+# вошедшим в панель администрирования. Без METRICS_TOKEN доступ есть только у сотрудников
+def is_authorized(request) -> bool:
+    token = settings.METRICS['TOKEN']
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+# Метрики процесса в формате Prometheus
+def metrics_view(request):
+    if not settings.METRICS['ENABLED']:
+        raise Http404
+    if not is_authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,152 @@
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, Http404
+
+from .metrics import is_authorized
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+# Нормализация SQL: литералы и параметры заменяются на ?, списки IN (?, ?, ...) сворачиваются,
+# чтобы запросы, отличающиеся только значениями, попадали в одну группу
+def normalize_sql(sql: str) -> str:
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+# Параметры запроса без значений, только их типы
+def redact_params(params) -> list:
+    return [f'<{type(param).__name__}>' for param in params or ()]
+
+
+def explain(connection, sql: str, params) -> list:
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+# Медленные запросы, сгруппированные по нормализованному SQL: количество, суммарное и максимальное время,
+# views, из которых они выполнялись, пример параметров (без значений) и план выполнения
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def record(self, statement: str, view: str, duration: float, params: list, plan_source):
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                if len(self._statements) >= settings.SLOW_QUERIES['MAX_STATEMENTS']:
+                    return None
+                entry = self._statements[statement] = {
+                    'sql': statement, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'views': [], 'params': params, 'plan': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            if view not in entry['views']:
+                entry['views'].append(view)
+            need_plan = entry['plan'] is None
+        # План строится один раз для каждого нормализованного запроса
+        if need_plan:
+            plan = plan_source()
+            with self._lock:
+                entry['plan'] = plan
+        return entry
+
+    def report(self) -> list:
+        with self._lock:
+            entries = [dict(entry) for entry in self._statements.values()]
+        return sorted(entries, key=lambda entry: entry['total_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._statements = {}
+
+
+slow_query_log = SlowQueryLog()
+
+
+# Обертка выполнения запросов БД одного HTTP запроса: запросы дольше THRESHOLD_MS
+# записываются в журнал и в лог вместе с планом выполнения
+class SlowQueryRecorder:
+    def __init__(self, request, connection):
+        self.request = request
+        self.connection = connection
+        self.threshold = settings.SLOW_QUERIES['THRESHOLD_MS'] / 1000
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold:
+            self.record(sql, params, many, duration)
+        return result
+
+    def record(self, sql, params, many, duration):
+        match = self.request.resolver_match
+        view = match.view_name if match else self.request.path
+        statement = normalize_sql(sql)
+
+        def plan_source():
+            if many:
+                return []
+            self.explaining = True
+            try:
+                return explain(self.connection, sql, params)
+            except Exception as error:
+                return [f'EXPLAIN не выполнен: {error}']
+            finally:
+                self.explaining = False
+
+        entry = slow_query_log.record(statement, view, duration, redact_params(None if many else params),
+                                      plan_source)
+        logger.warning('Медленный запрос %.1f мс в %s: %s params=%s plan=%s', duration * 1000, view, statement,
+                       entry['params'] if entry else redact_params(None if many else params),
+                       entry['plan'] if entry else None)
+
+
+# Профилирование SQL запросов. При SLOW_QUERY_LOG=False middleware исключается из цепочки при запуске
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERIES['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(SlowQueryRecorder(request, connection)))
+            return self.get_response(request)
+
+
+# Медленные запросы процесса, отсортированные по суммарному времени (доступ как к /metrics/)
+def slow_queries_view(request):
+    if not settings.SLOW_QUERIES['ENABLED']:
+        raise Http404
+    if not is_authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(json.dumps(slow_query_log.report(), ensure_ascii=False, indent=2),
+                        content_type='application/json')
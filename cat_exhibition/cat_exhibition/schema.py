@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import drf_spectacular
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+
+# Версия кода, от которой зависит схема: CODE_VERSION из окружения (например, хэш коммита при сборке)
+# или хэш исходников приложений проекта, версии drf-spectacular и его настроек
+def code_version() -> str:
+    if settings.SCHEMA_CACHE['CODE_VERSION']:
+        return settings.SCHEMA_CACHE['CODE_VERSION']
+    digest = hashlib.md5(f'{drf_spectacular.__version__}:{sorted(settings.SPECTACULAR_SETTINGS.items())}'.encode())
+    roots = {Path(config.path) for config in apps.get_app_configs()
+             if Path(config.path).is_relative_to(settings.BASE_DIR)}
+    roots.add(Path(__file__).resolve().parent)
+    for root in sorted(roots):
+        for path in sorted(root.rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def generate_schema() -> dict:
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+# Хранилище готовой схемы: файлы openapi-<версия кода>.<формат> в каталоге SCHEMA_CACHE['DIR'].
+# Схема генерируется один раз на версию кода (командой build_schema при сборке или при первом запросе),
+# а в памяти процесса хранятся тело ответа, его gzip версия и ETag
+class SchemaStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._documents = {}
+
+    def path(self, version: str, layout: str) -> Path:
+        return Path(settings.SCHEMA_CACHE['DIR']) / f'openapi-{version}.{layout}'
+
+    # Генерация схемы и запись файлов всех форматов (через временный файл, чтобы параллельный
+    # процесс не прочитал файл частично)
+    def build(self, version: str = None) -> list:
+        version = version or code_version()
+        schema = generate_schema()
+        paths = []
+        for layout, renderer in RENDERERS.items():
+            path = self.path(version, layout)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+                file.write(renderer().render(schema, renderer_context={}))
+            os.replace(file.name, path)
+            paths.append(path)
+        return paths
+
+    # Тело схемы в формате layout, ее gzip версия и значение для ETag (без кавычек)
+    def get(self, layout: str) -> tuple:
+        with self._lock:
+            if self._version is None:
+                self._version = code_version()
+            if layout not in self._documents:
+                path = self.path(self._version, layout)
+                if not path.exists():
+                    self.build(self._version)
+                body = path.read_bytes()
+                tag = f'{self._version}-{hashlib.md5(body).hexdigest()}'
+                self._documents[layout] = (body, gzip.compress(body), tag)
+            return self._documents[layout]
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._documents = {}
+
+
+schema_store = SchemaStore()
+
+
+# Выдача готовой схемы с ETag и сжатием gzip вместо ее генерации на каждый запрос.
+# Запросы с параметром lang (перевод схемы) обрабатываются стандартным способом
+class CachedSpectacularAPIView(SpectacularAPIView):
+    def _get_schema_response(self, request):
+        if request.GET.get('lang') or request.GET.get('version'):
+            return super()._get_schema_response(request)
+
+        renderer, media_type = self.perform_content_negotiation(request, force=True)
+        body, compressed, tag = schema_store.get(renderer.format)
+        # Сжатое и несжатое тело - разные представления, поэтому у них разные ETag
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = quote_etag(f'{tag}-gzip' if use_gzip else tag)
+        not_modified = HttpResponse(headers={'ETag': etag})
+        patch_vary_headers(not_modified, ['Accept', 'Accept-Encoding'])
+        response = get_conditional_response(request, etag=etag, response=not_modified)
+        if response is not not_modified:
+            return response
+
+        response = HttpResponse(content_type=media_type, headers={'ETag': etag})
+        if use_gzip:
+            response.content = compressed
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response.content = body
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cat_exhibition.metrics.MetricsMiddleware',
+    'cat_exhibition.profiling.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -136,17 +138,89 @@ CORS_ALLOW_CREDENTIALS = True
 # Настройки аутентификации
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Кэш: в памяти процесса (по умолчанию) или в файлах (CACHE_BACKEND=file), общих для всех процессов.
+# В нем хранятся поколения, по которым процессы узнают об изменениях данных (кэш ответов, кэш пород,
+# версия blacklist), поэтому при нескольких процессах (workers) нужен CACHE_BACKEND=file
+CACHES = {
+    'default': {
+        'BACKEND': ('django.core.cache.backends.filebased.FileBasedCache'
+                    if os.getenv('CACHE_BACKEND') == 'file'
+                    else 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+# Настройки кэширования ответов API: используемый кэш и время жизни ответов в секундах
+SHOW_CACHE = {
+    'ALIAS': 'default',
+    'TTL': {
+        'cats': int(os.getenv('CATS_CACHE_TTL', 60)),
+        'breeds': int(os.getenv('BREEDS_CACHE_TTL', 300)),
+    },
+}
+
+# Настройки пагинации списка питомцев (размер страницы по умолчанию и максимальный)
+CATS_PAGE_SIZE = int(os.getenv('CATS_PAGE_SIZE', 20))
+CATS_MAX_PAGE_SIZE = int(os.getenv('CATS_MAX_PAGE_SIZE', 100))
+
+# Максимальное количество питомцев в одном запросе массового добавления
+CATS_BULK_MAX_SIZE = int(os.getenv('CATS_BULK_MAX_SIZE', 100))
+
+# Максимальное количество оценок в одном пакетном запросе голосования
+VOTES_BATCH_MAX_SIZE = int(os.getenv('VOTES_BATCH_MAX_SIZE', 100))
+
+# Настройки пагинации истории голосов (размер страницы по умолчанию и максимальный)
+VOTES_PAGE_SIZE = int(os.getenv('VOTES_PAGE_SIZE', 20))
+VOTES_MAX_PAGE_SIZE = int(os.getenv('VOTES_MAX_PAGE_SIZE', 100))
+
+# Настройки таблицы лидеров: параметры взвешенного рейтинга и количество питомцев в ответе
+LEADERBOARD = {
+    'PRIOR_MEAN': float(os.getenv('LEADERBOARD_PRIOR_MEAN', 3)),
+    'PRIOR_WEIGHT': int(os.getenv('LEADERBOARD_PRIOR_WEIGHT', 5)),
+    'DEFAULT_LIMIT': 10,
+    'MAX_LIMIT': 100,
+}
+
+# Количество записей, читаемых из БД и отправляемых клиенту за раз при выгрузке данных
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Отложенный пересчет рейтингов питомцев при голосовании (write-behind).
+# Голоса сохраняются сразу, а рейтинги пересчитываются одним запросом
+# после накопления FLUSH_SIZE голосов или через FLUSH_INTERVAL_MS миллисекунд
+VOTES_WRITE_BEHIND = {
+    'ENABLED': os.getenv('VOTES_WRITE_BEHIND', 'False') == 'True',
+    'FLUSH_INTERVAL_MS': int(os.getenv('VOTES_FLUSH_INTERVAL_MS', 500)),
+    'FLUSH_SIZE': int(os.getenv('VOTES_FLUSH_SIZE', 100)),
+    'FLUSH_BATCH_SIZE': 1000,
+}
+
 # Настройки для JWT авторизации
 SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'ACCESS_TOKEN_LIFETIME': timedelta(days=3),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=60),
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
+}
+
+# Проверка отзыва refresh токенов по множеству в памяти процесса: кэш с общей версией blacklist
+# (только общий для процессов кэш, с кэшем в памяти процесса проверка идет запросом к БД),
+# период полной перезагрузки множества и запас догрузки новых записей в секундах
+TOKEN_BLACKLIST = {
+    'ALIAS': 'default',
+    'MAX_AGE': int(os.getenv('TOKEN_BLACKLIST_MAX_AGE', 300)),
+    'OVERLAP': int(os.getenv('TOKEN_BLACKLIST_OVERLAP', 60)),
+}
+
+# Кэширование пользователя при JWT аутентификации: используемый кэш и время жизни в секундах
+AUTH_USER_CACHE = {
+    'ALIAS': 'default',
+    'TTL': int(os.getenv('AUTH_USER_CACHE_TTL', 60)),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -154,4 +228,26 @@ SPECTACULAR_SETTINGS = {
     'DESCRIPTION': 'Swagger документация для API',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
-}
\ No newline at end of file
+}
+
+# Готовая OpenAPI схема: каталог файлов схемы и версия кода (если не задана, вычисляется по исходникам)
+SCHEMA_CACHE = {
+    'DIR': os.getenv('SCHEMA_DIR', str(BASE_DIR / 'cache' / 'schema')),
+    'CODE_VERSION': os.getenv('CODE_VERSION', ''),
+}
+
+# Метрики запросов в формате Prometheus (/metrics/): включение, токен доступа и границы корзин гистограмм
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'False') == 'True',
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    'QUERY_BUCKETS': (0, 1, 2, 3, 5, 10, 20, 50),
+}
+
+# Журнал медленных SQL запросов с планами выполнения (/profiling/slow-queries/): включение,
+# порог длительности запроса в миллисекундах и максимальное количество хранимых нормализованных запросов
+SLOW_QUERIES = {
+    'ENABLED': os.getenv('SLOW_QUERY_LOG', 'False') == 'True',
+    'THRESHOLD_MS': float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100)),
+    'MAX_STATEMENTS': 200,
+}
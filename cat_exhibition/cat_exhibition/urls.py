@@ -17,18 +17,25 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView
 )
 
+from .metrics import metrics_view
+from .profiling import slow_queries_view
+from .schema import CachedSpectacularAPIView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Все API маршруты
     path('api/', include('show.urls')),
     path('api-auth/', include('accounts.urls')),
+    # Метрики в формате Prometheus
+    path('metrics/', metrics_view, name='metrics'),
+    # Журнал медленных SQL запросов
+    path('profiling/slow-queries/', slow_queries_view, name='slow-queries'),
     # Swagger документация
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('schema/', CachedSpectacularAPIView.as_view(), name='schema'),
     path('schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 ]
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from .models import Cat, Breed, Vote
+from .models import Cat, Breed, BreedStats, Vote
 
 admin.site.register(Cat)
 admin.site.register(Breed)
 admin.site.register(Vote)
+admin.site.register(BreedStats)
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import current_generation
+from .models import Breed
+from .serializers import BreedSerializer
+
+
+# Кэш пород в памяти процесса. Породы загружаются одним запросом и хранятся уже сериализованными.
+# Кэш перезагружается, когда меняется поколение 'breeds' (увеличивается при любом изменении породы,
+# в том числе через панель администрирования) или истекает время жизни. Поколение общее для процессов
+# только при общем кэше (CACHE_BACKEND=file), с кэшем в памяти процесса другие процессы видят изменения
+# лишь по истечении времени жизни
+class BreedCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._loaded_at = 0
+        self._breeds = {}
+
+    def _refresh(self):
+        generation = current_generation('breeds')
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > settings.SHOW_CACHE['TTL']['breeds']
+            if expired or generation != self._generation:
+                self._breeds = {breed.id: BreedSerializer(breed).data for breed in Breed.objects.order_by('id')}
+                self._generation = generation
+                self._loaded_at = time.monotonic()
+            return self._breeds
+
+    # Словарь {id породы: данные BreedSerializer}
+    def get(self) -> dict:
+        return self._refresh()
+
+    def clear(self):
+        with self._lock:
+            self._generation = None
+
+
+breed_cache = BreedCache()
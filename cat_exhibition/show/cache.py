@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Счетчики попаданий и промахов кэша по endpoint (в пределах процесса)
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.SHOW_CACHE['ALIAS']]
+
+
+def _generation_key(namespace: str) -> str:
+    return f'show:generation:{namespace}'
+
+
+# Поколения пространств имен кэша. Ключ ответа включает поколения всех данных,
+# от которых он зависит, поэтому инвалидация - это увеличение поколения, без поиска ключей.
+# Поколение - время последнего изменения данных в наносекундах, поэтому оно же служит временем изменения
+# коллекции для Last-Modified. Пропавшее поколение создается заново из текущего времени,
+# чтобы не вернуть старые ответы
+def _generations(namespaces: list) -> list:
+    cache = get_cache()
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def current_generation(namespace: str):
+    return _generations([namespace])[0]
+
+
+# Версии коллекции для условного GET по поколениям ее данных: меняются при любом изменении, в том числе
+# удалении записей, и не требуют запроса к БД
+def collection_versions(namespaces: list) -> list:
+    return [{'generation': generation, 'updated_at': datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)}
+            for generation in _generations(namespaces)]
+
+
+# Новое поколение - текущее время, но всегда больше предыдущего (на случай расхождения часов процессов)
+def _invalidate_now(namespaces: list):
+    cache = get_cache()
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        cache.set(key, max(time.time_ns(), (cache.get(key) or 0) + 1), timeout=None)
+
+
+# Инвалидация кэша после фиксации транзакции, чтобы параллельный запрос
+# не сохранил в кэш данные, которые еще не записаны
+def invalidate(*namespaces: str):
+    namespaces = list(namespaces)
+    transaction.on_commit(lambda: _invalidate_now(namespaces))
+
+
+def invalidate_cats(cat_ids=()):
+    invalidate('cats', *[f'cat:{cat_id}' for cat_id in cat_ids])
+
+
+def invalidate_breeds():
+    invalidate('breeds')
+
+
+# Получение данных ответа из кэша или их построение и сохранение в кэш.
+# endpoint - имя для ключа и счетчиков, namespaces - данные, от которых зависит ответ,
+# ttl - ключ времени жизни из настроек SHOW_CACHE['TTL'],
+# vary - дополнительная часть ключа для ответов, которые при том же URL зависят от пользователя
+def get_or_build(request, endpoint: str, namespaces: list, ttl: str, build, vary: str = ''):
+    cache = get_cache()
+    generations = '.'.join(str(generation) for generation in _generations(namespaces))
+    url = hashlib.md5(f'{vary}:{request.build_absolute_uri()}'.encode()).hexdigest()
+    key = f'show:response:{endpoint}:{generations}:{url}'
+
+    data = cache.get(key)
+    with _stats_lock:
+        _stats[endpoint]['hits' if data is not None else 'misses'] += 1
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.SHOW_CACHE['TTL'][ttl])
+    return data
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        stats = {endpoint: dict(counters) for endpoint, counters in _stats.items()}
+    for counters in stats.values():
+        total = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / total if total else 0
+    return stats
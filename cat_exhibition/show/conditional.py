@@ -0,0 +1,28 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# Условный GET: при совпадении If-None-Match/ If-Modified-Since возвращается 304 без построения ответа,
+# иначе ответ строится функцией build и дополняется заголовками ETag и Last-Modified.
+# versions - словари версий данных, от которых зависит ответ (collection_versions или version/updated_at записи)
+def conditional_response(request, versions: list, build):
+    source = ':'.join([request.get_full_path(), *[str(sorted(version.items())) for version in versions]])
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    modified = [version['updated_at'] for version in versions if version.get('updated_at')]
+    timestamp = int(max(modified).timestamp()) if modified else None
+    headers = {'ETag': etag}
+    if timestamp is not None:
+        headers['Last-Modified'] = http_date(timestamp)
+
+    not_modified = HttpResponse(headers=headers)
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp, response=not_modified)
+    if response is not not_modified:
+        return response
+
+    response = build()
+    for header, value in headers.items():
+        response[header] = value
+    return response
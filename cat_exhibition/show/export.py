@@ -0,0 +1,56 @@
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .breed_cache import breed_cache
+from .fast_serializers import FastCatSerializer, CAT_VALUES
+from .models import Cat, Vote
+
+VOTE_VALUES = ('id', 'value', 'user_id', 'cat_id', 'is_counted', 'created_at')
+
+
+# Питомцы в формате CatSerializer. Строки читаются из БД порциями (серверный курсор там, где он есть),
+# поэтому потребление памяти не зависит от размера таблицы
+def iter_cats():
+    serializer = FastCatSerializer(breed_cache.get())
+    rows = Cat.objects.order_by('id').values(*CAT_VALUES).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield serializer.to_representation(row)
+
+
+# История голосов
+def iter_votes():
+    rows = Vote.objects.order_by('id').values(*VOTE_VALUES).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield {'id': row['id'], 'value': row['value'], 'user': row['user_id'], 'cat': row['cat_id'],
+               'is_counted': row['is_counted'], 'created_at': row['created_at']}
+
+
+EXPORTERS = {
+    'cats': iter_cats,
+    'votes': iter_votes,
+}
+
+# Форматы выгрузки: JSON Lines (объект на строку) или JSON массив
+LAYOUTS = {
+    'jsonl': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+# Кодирование записей в байты выбранного формата порциями по EXPORT_CHUNK_SIZE записей
+def render(items, layout: str):
+    encoder = JSONEncoder(ensure_ascii=False)
+    jsonl = layout == 'jsonl'
+    if not jsonl:
+        yield b'['
+    buffer = []
+    for index, item in enumerate(items):
+        line = encoder.encode(item)
+        buffer.append(line + '\n' if jsonl else (',' if index else '') + line)
+        if len(buffer) >= settings.EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode()
+    if not jsonl:
+        yield b']'
@@ -0,0 +1,70 @@
+import math
+
+from drf_spectacular.utils import OpenApiParameter
+
+from .models import MAX_ID
+
+
+# Фильтр по одному query параметру: преобразование значения и условие ORM
+class FilterField:
+    def __init__(self, lookup: str, parse, description: str, minimum=None):
+        self.lookup = lookup
+        self.parse = parse
+        self.description = description
+        self.minimum = minimum
+
+    # Условие ORM для значения параметра. ValueError, если значение не проходит ограничения фильтра
+    # или не помещается в столбец БД: nan и inf молча дают пустую выборку, а целые вне 64 бит
+    # переполняют драйвер БД
+    def condition(self, value: str) -> dict:
+        value = self.parse(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError
+        if isinstance(value, int) and not -MAX_ID - 1 <= value <= MAX_ID:
+            raise ValueError
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError
+        return {self.lookup: value}
+
+
+# Набор фильтров, объявленных атрибутами класса FilterField. Параметры OpenAPI документации
+# строятся из тех же объявлений, поэтому документация не расходится с поддерживаемыми фильтрами
+class FilterSet:
+    @classmethod
+    def fields(cls) -> dict:
+        return {name: field for name, field in vars(cls).items() if isinstance(field, FilterField)}
+
+    # Применение переданных фильтров к queryset, ValueError с именем параметра при некорректном значении
+    @classmethod
+    def apply(cls, queryset, params):
+        conditions = {}
+        for name, field in cls.fields().items():
+            value = params.get(name)
+            if value in (None, ''):
+                continue
+            try:
+                conditions.update(field.condition(value))
+            except (TypeError, ValueError):
+                raise ValueError(name)
+        return queryset.filter(**conditions) if conditions else queryset
+
+    @classmethod
+    def parameters(cls) -> list:
+        types = {int: int, float: float, str: str}
+        return [OpenApiParameter(name=name, location=OpenApiParameter.QUERY, description=field.description,
+                                 required=False, type=types.get(field.parse, str))
+                for name, field in cls.fields().items()]
+
+
+# Фильтры списка питомцев. Фильтрам на равенство (порода, владелец, окрас) соответствуют составные индексы
+# (поле, id) и (поле, rating, id), поэтому страница при любой сортировке - поиск по диапазону индекса.
+# Фильтры по диапазону (возраст, рейтинг, голоса) проверяются при обходе индекса в порядке сортировки,
+# который останавливается после заполнения страницы и не требует сортировки всей выборки
+class CatFilterSet(FilterSet):
+    breed_id = FilterField('breed_id', int, 'Id породы для фильтрации запроса')
+    owner_id = FilterField('owner_id', int, 'Id владельца')
+    color = FilterField('color', str, 'Окрас (точное совпадение)')
+    age_min = FilterField('age__gte', int, 'Минимальный возраст в месяцах', minimum=0)
+    age_max = FilterField('age__lte', int, 'Максимальный возраст в месяцах', minimum=0)
+    rating_min = FilterField('rating__gte', float, 'Минимальный рейтинг', minimum=0)
+    votes_min = FilterField('total_votes__gte', int, 'Минимальное количество голосов', minimum=0)
@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from show.breed_cache import breed_cache
+from show.fast_serializers import FastCatSerializer, CAT_VALUES
+from show.models import Cat, Breed
+from show.serializers import CatSerializer
+
+
+# Сравнение скорости CatSerializer и быстрого сериализатора на тестовых питомцах.
+# Данные создаются внутри транзакции, которая откатывается после замеров
+class Command(BaseCommand):
+    help = 'Сравнение скорости сериализации списка питомцев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Количество питомцев')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество повторов замера')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            owners = User.objects.bulk_create([User(username=f'benchmark_owner_{i}') for i in range(100)])
+            breeds = Breed.objects.bulk_create([Breed(name=f'benchmark_breed_{i}') for i in range(20)])
+            Cat.objects.bulk_create([Cat(name=f'Cat {i}', color='Черный', description='Тестовый питомец',
+                                         age=i % 200, breed=breeds[i % len(breeds)],
+                                         owner=owners[i % len(owners)], total_marks=i % 50, total_votes=i % 10,
+                                         rating=(i % 50) / (i % 10 or 1))
+                                     for i in range(rows)], batch_size=1000)
+            breed_cache.clear()
+            breeds_data = breed_cache.get()
+            cats = Cat.objects.select_related('owner').order_by('id')[:rows]
+            values = Cat.objects.order_by('id').values(*CAT_VALUES)[:rows]
+
+            slow_time, slow = self.measure(options['repeat'], lambda: JSONRenderer().render(
+                CatSerializer(cats.all(), many=True, context={'breeds': breeds_data}).data))
+            fast_time, fast = self.measure(options['repeat'], lambda: JSONRenderer().render(
+                FastCatSerializer(breeds_data).many(values.all())))
+            transaction.set_rollback(True)
+        breed_cache.clear()
+
+        self.stdout.write(f'Питомцев: {rows}')
+        self.stdout.write(f'CatSerializer: {slow_time:.3f} с')
+        self.stdout.write(f'FastCatSerializer: {fast_time:.3f} с')
+        self.stdout.write(f'Ускорение: {slow_time / fast_time:.1f}x')
+        if slow == fast:
+            self.stdout.write(self.style.SUCCESS('JSON ответов совпадает'))
+        else:
+            self.stdout.write(self.style.ERROR('JSON ответов различается'))
+
+    # Лучшее время из нескольких повторов (с запросом к БД) и результат последнего
+    @staticmethod
+    def measure(repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from cat_exhibition.schema import code_version, schema_store
+
+
+# Генерация OpenAPI схемы для текущей версии кода при сборке, чтобы процессы не строили ее при запуске
+class Command(BaseCommand):
+    help = 'Генерация OpenAPI схемы в формате YAML и JSON для текущей версии кода'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--code-version', help='Версия кода (по умолчанию CODE_VERSION или хэш исходников)')
+
+    def handle(self, *args, **options):
+        version = options['code_version'] or code_version()
+        for path in schema_store.build(version):
+            self.stdout.write(self.style.SUCCESS(f'Схема записана в {path}'))
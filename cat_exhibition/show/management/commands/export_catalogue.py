@@ -0,0 +1,31 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from show.export import EXPORTERS, LAYOUTS, render
+
+
+# Потоковая выгрузка питомцев или истории голосов в файл или стандартный вывод
+class Command(BaseCommand):
+    help = 'Выгрузка питомцев или истории голосов в JSON Lines/ JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(EXPORTERS), help='Выгружаемые данные')
+        parser.add_argument('--layout', choices=list(LAYOUTS), default='jsonl', help='Формат выгрузки')
+        parser.add_argument('--output', help='Путь к файлу (по умолчанию стандартный вывод)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        chunks = render(EXPORTERS[options['resource']](), options['layout'])
+        size = 0
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    size += len(chunk)
+            self.stderr.write(f'Выгружено {size} байт за {time.perf_counter() - start:.2f} с')
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from show.vote_buffer import flush_pending_votes
+
+
+# Принудительный перенос голосов, сохраненных в режиме отложенного пересчета, в рейтинги питомцев
+class Command(BaseCommand):
+    help = 'Перенос неучтенных голосов в рейтинги питомцев'
+
+    def handle(self, *args, **options):
+        flushed = flush_pending_votes()
+        self.stdout.write(self.style.SUCCESS(f'Учтено голосов: {flushed}'))
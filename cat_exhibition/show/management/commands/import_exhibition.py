@@ -0,0 +1,193 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from show.cache import invalidate_cats, invalidate_breeds
+from show.models import Breed, BreedStats, Cat, Vote
+
+# Максимальное количество ошибок в строках, выводимых в отчете
+MAX_REPORTED_ERRORS = 20
+
+
+# Чтение записей из CSV (с заголовком) или JSON Lines файла с номерами строк
+def read_rows(path: str):
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            for number, row in enumerate(csv.DictReader(file), start=2):
+                yield number, row
+        elif path.endswith('.jsonl'):
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        raise CommandError(f'Файл {path}, строка {number}: некорректный JSON')
+                    yield number, row
+        else:
+            raise CommandError(f'Файл {path} должен иметь расширение .csv или .jsonl')
+
+
+def batches(rows, size: int):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def required_text(row: dict, field: str, max_length: int) -> str:
+    value = str(row.get(field) or '').strip()
+    if not value:
+        raise ValueError(f'не заполнено поле {field}')
+    if len(value) > max_length:
+        raise ValueError(f'поле {field} длиннее {max_length} символов')
+    return value
+
+
+def integer(row: dict, field: str, minimum: int, maximum: int = None) -> int:
+    try:
+        value = int(row.get(field))
+    except (TypeError, ValueError):
+        raise ValueError(f'поле {field} должно быть целым числом')
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f'поле {field} вне допустимого диапазона')
+    return value
+
+
+# Массовый импорт пород, питомцев и голосов из CSV/ JSON Lines файлов.
+# Строки проверяются и вставляются пачками через bulk_create, каждая пачка в своей транзакции.
+# Породы и владельцы сопоставляются по именам через словари, загруженные одним запросом,
+# а рейтинги питомцев пересчитываются один раз после импорта голосов
+class Command(BaseCommand):
+    help = 'Массовый импорт пород, питомцев и голосов из CSV/ JSON Lines файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--breeds', help='Файл пород: name, description')
+        parser.add_argument('--cats', help='Файл питомцев: name, color, description, age, breed (название), '
+                                           'owner (имя пользователя)')
+        parser.add_argument('--votes', help='Файл голосов: user (имя пользователя), cat_id, value')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество строк в пачке')
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name in ('breeds', 'cats', 'votes')):
+            raise CommandError('Передайте хотя бы один файл: --breeds, --cats или --votes')
+        self.batch_size = options['batch_size']
+        if options['breeds']:
+            self.run('Породы', options['breeds'], self.import_breeds)
+            invalidate_breeds()
+        if options['cats']:
+            self.run('Питомцы', options['cats'], self.import_cats)
+            invalidate_cats()
+        if options['votes']:
+            self.run('Голоса', options['votes'], self.import_votes)
+        # bulk_create не вызывает сигналы, статистика пород пересчитывается один раз после импорта
+        BreedStats.objects.recompute()
+
+    # Импорт одного файла с отчетом о количестве строк, ошибках и скорости
+    def run(self, title: str, path: str, importer):
+        self.errors = []
+        start = time.perf_counter()
+        total, created = importer(read_rows(path))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{title}: прочитано {total}, принято {created}, ошибок {len(self.errors)}, '
+                          f'{total / elapsed if elapsed else total:.0f} строк/с')
+        for number, message in self.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f'  строка {number}: {message}')
+
+    # Проверка строк пачки, возвращает пары (номер строки, объект) корректных строк
+    def validate(self, batch, parse):
+        valid = []
+        for number, row in batch:
+            try:
+                valid.append((number, parse(row)))
+            except ValueError as error:
+                self.errors.append((number, str(error)))
+        return valid
+
+    def import_breeds(self, rows):
+        existing = set(Breed.objects.values_list('name', flat=True))
+        total = created = 0
+        for batch in batches(rows, self.batch_size):
+            total += len(batch)
+            breeds = []
+            for _, breed in self.validate(batch, lambda row: Breed(name=required_text(row, 'name', 128),
+                                                                description=str(row.get('description') or ''))):
+                # Существующие и повторяющиеся в файле породы пропускаются
+                if breed.name not in existing:
+                    existing.add(breed.name)
+                    breeds.append(breed)
+            with transaction.atomic():
+                Breed.objects.bulk_create(breeds)
+            created += len(breeds)
+        return total, created
+
+    def import_cats(self, rows):
+        breeds = dict(Breed.objects.values_list('name', 'id'))
+        owners = dict(User.objects.values_list('username', 'id'))
+
+        def parse(row):
+            breed = required_text(row, 'breed', 128)
+            owner = required_text(row, 'owner', 150)
+            if breed not in breeds:
+                raise ValueError(f'порода {breed} не найдена')
+            if owner not in owners:
+                raise ValueError(f'пользователь {owner} не найден')
+            return Cat(name=required_text(row, 'name', 64),
+                       color=required_text(row, 'color', 64),
+                       description=required_text(row, 'description', 512),
+                       age=integer(row, 'age', 0),
+                       breed_id=breeds[breed],
+                       owner_id=owners[owner])
+
+        total = created = 0
+        for batch in batches(rows, self.batch_size):
+            total += len(batch)
+            cats = [cat for _, cat in self.validate(batch, parse)]
+            with transaction.atomic():
+                Cat.objects.bulk_create(cats)
+            created += len(cats)
+        return total, created
+
+    def import_votes(self, rows):
+        users = dict(User.objects.values_list('username', 'id'))
+
+        def parse(row):
+            user = required_text(row, 'user', 150)
+            if user not in users:
+                raise ValueError(f'пользователь {user} не найден')
+            return Vote(user_id=users[user], cat_id=integer(row, 'cat_id', 1), value=integer(row, 'value', 0, 5))
+
+        total = created = 0
+        touched = set()
+        for batch in batches(rows, self.batch_size):
+            total += len(batch)
+            valid = self.validate(batch, parse)
+            # Проверка существования всех питомцев пачки одним запросом
+            cat_ids = set(Cat.objects.filter(id__in={vote.cat_id for _, vote in valid}).values_list('id', flat=True))
+            votes = []
+            with transaction.atomic():
+                # Повторные голоса пользователя за питомца (уже в БД или в файле) отклоняются с ошибкой,
+                # поэтому в отчет попадают только действительно добавленные голоса
+                voted = set(Vote.objects.filter(user_id__in={vote.user_id for _, vote in valid}, cat_id__in=cat_ids)
+                            .values_list('user_id', 'cat_id'))
+                for number, vote in valid:
+                    if vote.cat_id not in cat_ids:
+                        self.errors.append((number, f'питомец с id={vote.cat_id} не найден'))
+                    elif (vote.user_id, vote.cat_id) in voted:
+                        self.errors.append((number, f'повторный голос за питомца с id={vote.cat_id}'))
+                    else:
+                        voted.add((vote.user_id, vote.cat_id))
+                        votes.append(vote)
+                # Голоса, добавленные параллельно после проверки, пропускаются ограничением уникальности
+                Vote.objects.bulk_create(votes, ignore_conflicts=True)
+            created += len(votes)
+            touched.update(cat_ids)
+
+        # Рейтинги пересчитываются один раз для всех затронутых питомцев
+        for ids in batches(sorted(touched), self.batch_size):
+            with transaction.atomic():
+                Cat.objects.filter(id__in=ids).recompute_aggregates()
+        return total, created
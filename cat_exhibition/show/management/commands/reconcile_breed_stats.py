@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from show.cache import invalidate_cats
+from show.models import BreedStats
+
+STATS_FIELDS = ('breed_id', 'cat_count', 'total_marks', 'total_votes')
+
+
+# Пересчет статистики пород заново по питомцам с отчетом о расхождениях
+class Command(BaseCommand):
+    help = 'Пересчет статистики пород по питомцам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            before = {row[0]: row for row in BreedStats.objects.values_list(*STATS_FIELDS)}
+            BreedStats.objects.recompute()
+            after = {row[0]: row for row in BreedStats.objects.values_list(*STATS_FIELDS)}
+            invalidate_cats()
+        changed = [breed_id for breed_id, row in after.items() if before.get(breed_id) != row]
+        for breed_id in changed:
+            self.stdout.write(f'  порода {breed_id}: {before.get(breed_id)} -> {after[breed_id]}')
+        self.stdout.write(self.style.SUCCESS(f'Пород: {len(after)}, исправлено: {len(changed)}'))
@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from show.cache import invalidate_cats
+from show.models import BreedStats, Cat, Vote, weighted_score
+
+# Максимальное количество расхождений, выводимых в отчете
+MAX_REPORTED_DIFFS = 20
+
+
+# Поиск расхождений среди питомцев: суммы учтенных голосов группируются в БД одним запросом
+# и сравниваются с сохраненными значениями. Возвращает количество проверенных питомцев
+# и список расхождений (id, сохраненные, фактические значения)
+def find_diffs(cats: dict) -> tuple:
+    stored = {cat_id: (marks, votes) for cat_id, marks, votes in
+              Cat.objects.filter(**cats).values_list('id', 'total_marks', 'total_votes')}
+    actual = {row['cat_id']: (row['marks'], row['votes']) for row in
+              Vote.objects.filter(is_counted=True, **{f'cat_{lookup}': value for lookup, value in cats.items()})
+              .order_by().values('cat_id').annotate(marks=Sum('value'), votes=Count('id'))}
+    return len(stored), [(cat_id, values, actual.get(cat_id, (0, 0)))
+                         for cat_id, values in stored.items() if values != actual.get(cat_id, (0, 0))]
+
+
+# Границы диапазонов по фактическим id питомцев: каждый диапазон [start, stop) содержит chunk_size питомцев,
+# последний открыт справа (stop = None). Начало следующего диапазона ищется по индексу первичного ключа,
+# поэтому пропуски в id не порождают пустых диапазонов
+def chunk_bounds(chunk_size: int) -> list:
+    bounds = []
+    start = Cat.objects.order_by('id').values_list('id', flat=True).first()
+    while start is not None:
+        stop = (Cat.objects.filter(id__gte=start).order_by('id')
+                .values_list('id', flat=True)[chunk_size:chunk_size + 1].first())
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+# Поиск расхождений в диапазоне id питомцев [start, stop), оба чтения в одном снимке БД
+def find_chunk_diffs(start: int, stop: int | None) -> tuple:
+    cats = {'id__gte': start} if stop is None else {'id__gte': start, 'id__lt': stop}
+    with transaction.atomic():
+        return find_diffs(cats)
+
+
+# Исправление расхождений диапазона одним bulk_update готовыми значениями.
+# Расхождения перепроверяются в транзакции записи, чтобы не затереть голоса, поступившие после поиска
+def apply_diffs(diffs: list) -> int:
+    with transaction.atomic():
+        _, diffs = find_diffs({'id__in': [cat_id for cat_id, _, _ in diffs]})
+        now = timezone.now()
+        cats = [Cat(id=cat_id, total_marks=marks, total_votes=votes, rating=marks / votes if votes else 0.0,
+                    score=weighted_score(marks, votes), version=F('version') + 1, updated_at=now)
+                for cat_id, _, (marks, votes) in diffs]
+        Cat.objects.bulk_update(cats, ['total_marks', 'total_votes', 'rating', 'score', 'version', 'updated_at'])
+        invalidate_cats([cat.id for cat in cats])
+    return len(cats)
+
+
+# Сверка суммарных оценок, количества голосов и рейтингов питомцев с таблицей голосов.
+# Питомцы обрабатываются диапазонами id: поиск расхождений (группировка голосов) выполняется параллельно
+# в нескольких потоках, а исправления записываются последовательно, так как SQLite допускает одного писателя
+class Command(BaseCommand):
+    help = 'Сверка и исправление рейтингов питомцев по учтенным голосам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Размер диапазона id питомцев')
+        parser.add_argument('--workers', type=int, default=1, help='Количество параллельных потоков')
+        parser.add_argument('--dry-run', action='store_true', help='Только отчет о расхождениях, без исправлений')
+
+    def handle(self, *args, **options):
+        chunk_size, workers, dry_run = options['chunk_size'], options['workers'], options['dry_run']
+        if chunk_size < 1 or workers < 1:
+            raise CommandError('--chunk-size и --workers должны быть положительными')
+
+        start = time.perf_counter()
+        chunks = chunk_bounds(chunk_size)
+        if workers == 1:
+            results = [find_chunk_diffs(*chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lambda chunk: self.run_in_thread(*chunk), chunks))
+        checked = sum(count for count, _ in results)
+        diffs = [diff for _, chunk_diffs in results for diff in chunk_diffs]
+        fixed = 0
+        if not dry_run:
+            fixed = sum(apply_diffs(chunk_diffs) for _, chunk_diffs in results if chunk_diffs)
+            # Статистика пород строится из сумм питомцев, после исправлений она пересчитывается целиком,
+            # так как расхождения питомцев могли попасть в нее и раньше
+            if fixed:
+                BreedStats.objects.recompute()
+        elapsed = time.perf_counter() - start
+
+        for cat_id, saved, real in diffs[:MAX_REPORTED_DIFFS]:
+            self.stdout.write(f'  питомец {cat_id}: оценки/ голоса {saved[0]}/{saved[1]} -> {real[0]}/{real[1]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено питомцев: {checked}, найдено расхождений: {len(diffs)}, исправлено: {fixed}, '
+            f'{checked / elapsed if elapsed else checked:.0f} питомцев/с'))
+
+    # Каждый поток работает со своим подключением к БД и закрывает его по завершении диапазона
+    @staticmethod
+    def run_in_thread(start: int, stop: int | None) -> tuple:
+        try:
+            return find_chunk_diffs(start, stop)
+        finally:
+            connections.close_all()
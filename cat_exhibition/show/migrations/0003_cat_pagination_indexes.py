@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0002_cat_total_marks_cat_total_votes_alter_vote_cat_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['breed', 'id'], name='show_cat_breed_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['rating', 'id'], name='show_cat_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['breed', 'rating', 'id'], name='show_cat_breed_rating_id_idx'),
+        ),
+    ]
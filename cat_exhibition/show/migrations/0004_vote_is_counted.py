@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0003_cat_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='is_counted',
+            field=models.BooleanField(default=True, verbose_name='Учтен в рейтинге'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(condition=models.Q(('is_counted', False)), fields=['id'], name='show_vote_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:13
+
+import show.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Расчет взвешенного рейтинга для уже существующих питомцев
+def fill_score(apps, schema_editor):
+    Cat = apps.get_model('show', 'Cat')
+    Cat.objects.update(score=show.models.weighted_score(F('total_marks'), F('total_votes')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0004_vote_is_counted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cat',
+            name='score',
+            field=models.FloatField(default=show.models.default_score, verbose_name='Взвешенный рейтинг животного'),
+        ),
+        migrations.RunPython(fill_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['rating', 'total_votes', 'id'], name='show_cat_top_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['breed', 'rating', 'total_votes', 'id'], name='show_cat_breed_top_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['score', 'total_votes', 'id'], name='show_cat_top_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['breed', 'score', 'total_votes', 'id'], name='show_cat_breed_top_score_idx'),
+        ),
+    ]
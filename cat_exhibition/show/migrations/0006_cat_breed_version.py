@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0005_cat_score_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breed',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+        migrations.AddField(
+            model_name='breed',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Версия записи'),
+        ),
+        migrations.AddField(
+            model_name='cat',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+        migrations.AddField(
+            model_name='cat',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Версия записи'),
+        ),
+    ]
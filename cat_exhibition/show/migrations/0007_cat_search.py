@@ -0,0 +1,66 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'show_cat_search'
+
+# Индекс заполняется и поддерживается триггерами, поэтому изменения через ORM, bulk_create,
+# панель администрирования и прямые SQL запросы попадают в него одинаково
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"name, description, color, breed_name, tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, color, breed_name) "
+    f"SELECT show_cat.id, show_cat.name, show_cat.description, show_cat.color, show_breed.name "
+    f"FROM show_cat JOIN show_breed ON show_breed.id = show_cat.breed_id",
+    f"CREATE TRIGGER show_cat_search_insert AFTER INSERT ON show_cat BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, color, breed_name) "
+    f"SELECT new.id, new.name, new.description, new.color, name FROM show_breed WHERE id = new.breed_id; END",
+    # Обновление рейтингов не меняет поля поиска и не запускает триггер
+    f"CREATE TRIGGER show_cat_search_update AFTER UPDATE OF name, description, color, breed_id ON show_cat BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, color, breed_name) "
+    f"SELECT new.id, new.name, new.description, new.color, name FROM show_breed WHERE id = new.breed_id; END",
+    f"CREATE TRIGGER show_cat_search_delete AFTER DELETE ON show_cat BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; END",
+    f"CREATE TRIGGER show_breed_search_update AFTER UPDATE OF name ON show_breed BEGIN "
+    f"UPDATE {SEARCH_TABLE} SET breed_name = new.name "
+    f"WHERE rowid IN (SELECT id FROM show_cat WHERE breed_id = new.id); END",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS show_breed_search_update',
+    'DROP TRIGGER IF EXISTS show_cat_search_delete',
+    'DROP TRIGGER IF EXISTS show_cat_search_update',
+    'DROP TRIGGER IF EXISTS show_cat_search_insert',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+]
+
+
+def fts5_supported(schema_editor) -> bool:
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+# Полнотекстовый индекс создается только на SQLite с FTS5, на других БД поиск работает через icontains
+def create_search_index(apps, schema_editor):
+    if fts5_supported(schema_editor):
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0006_cat_breed_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0007_cat_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['owner', 'id'], name='show_cat_owner_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['owner', 'rating', 'id'], name='show_cat_owner_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['color', 'id'], name='show_cat_color_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['color', 'rating', 'id'], name='show_cat_color_rating_id_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+# Статистика уже существующих пород по их питомцам
+def fill_breed_stats(apps, schema_editor):
+    Breed = apps.get_model('show', 'Breed')
+    Cat = apps.get_model('show', 'Cat')
+    BreedStats = apps.get_model('show', 'BreedStats')
+    totals = {row['breed']: row for row in Cat.objects.order_by().values('breed').annotate(
+        cat_count=Count('id'), total_marks=Sum('total_marks'), total_votes=Sum('total_votes'))}
+    stats = []
+    for breed_id in Breed.objects.values_list('id', flat=True):
+        row = totals.get(breed_id, {'cat_count': 0, 'total_marks': 0, 'total_votes': 0})
+        stats.append(BreedStats(breed_id=breed_id, cat_count=row['cat_count'], total_marks=row['total_marks'],
+                                total_votes=row['total_votes'],
+                                rating=row['total_marks'] / row['total_votes'] if row['total_votes'] else 0))
+    BreedStats.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0008_cat_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreedStats',
+            fields=[
+                ('breed', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='show.breed', verbose_name='Порода')),
+                ('cat_count', models.IntegerField(default=0, verbose_name='Количество питомцев')),
+                ('total_marks', models.IntegerField(default=0, verbose_name='Суммарная оценка')),
+                ('total_votes', models.IntegerField(default=0, verbose_name='Количество голосов')),
+                ('rating', models.FloatField(default=0, verbose_name='Средняя оценка')),
+            ],
+            options={
+                'verbose_name': 'Статистика породы',
+                'verbose_name_plural': 'Статистика пород',
+            },
+        ),
+        migrations.RunPython(fill_breed_stats, migrations.RunPython.noop),
+    ]
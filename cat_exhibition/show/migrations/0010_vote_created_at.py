@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:31
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('show', '0009_breed_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Время голосования'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['cat', 'created_at', 'id'], name='show_vote_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='show_vote_user_created_idx'),
+        ),
+    ]
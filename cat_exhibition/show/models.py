@@ -1,5 +1,84 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import F, Value, Case, When, Count, Sum, OuterRef, Subquery
+from django.db.models.functions import Cast, Now, Coalesce
+from django.db.models.lookups import GreaterThan
+
+from .cache import invalidate_cats
+
+# Наибольшее значение id (64-битный целочисленный столбец БД)
+MAX_ID = 2 ** 63 - 1
+
+
+# Id из url или query параметра. ValueError, если значение не целое число от 1 до MAX_ID:
+# такие значения отклоняются до запроса, иначе драйвер БД падает на переполнении
+def parse_id(value) -> int:
+    value = int(value)
+    if not 1 <= value <= MAX_ID:
+        raise ValueError(f'id вне диапазона: {value}')
+    return value
+
+
+class CatQuerySet(models.QuerySet):
+    # Изменение суммарной оценки, количества голосов и рейтинга питомцев одним UPDATE запросом.
+    # deltas - словарь {id питомца: (изменение суммы оценок, изменение количества голосов)}.
+    # Вычисления выполняются в БД, поэтому параллельные голоса не теряются
+    def apply_vote_deltas(self, deltas: dict) -> int:
+        if not deltas:
+            return 0
+        marks = Case(*[When(pk=pk, then=Value(delta[0])) for pk, delta in deltas.items()],
+                     default=Value(0), output_field=models.IntegerField())
+        votes = Case(*[When(pk=pk, then=Value(delta[1])) for pk, delta in deltas.items()],
+                     default=Value(0), output_field=models.IntegerField())
+        total_marks = F('total_marks') + marks
+        total_votes = F('total_votes') + votes
+        updated = self.filter(pk__in=deltas).update(**aggregate_fields(total_marks, total_votes))
+        BreedStats.objects.apply_vote_deltas(deltas)
+        invalidate_cats(deltas)
+        return updated
+
+    # Пересчет суммарной оценки, количества голосов и рейтинга питомцев заново по учтенным голосам.
+    # Выполняется одним UPDATE запросом с подзапросами к таблице голосов
+    def recompute_aggregates(self) -> int:
+        ids = list(self.values_list('id', flat=True))
+        votes = Vote.objects.filter(cat=OuterRef('pk'), is_counted=True).order_by().values('cat')
+        total_marks = Coalesce(Subquery(votes.annotate(total=Sum('value')).values('total')), 0)
+        total_votes = Coalesce(Subquery(votes.annotate(total=Count('id')).values('total')), 0)
+        updated = Cat.objects.filter(pk__in=ids).update(**aggregate_fields(total_marks, total_votes))
+        invalidate_cats(ids)
+        return updated
+
+
+# Значения полей рейтинга питомца по выражениям новой суммы оценок и нового количества голосов
+def aggregate_fields(total_marks, total_votes) -> dict:
+    rating = Case(When(GreaterThan(total_votes, 0),
+                       then=Cast(total_marks, models.FloatField()) / total_votes),
+                  default=Value(0.0), output_field=models.FloatField())
+    return {
+        'total_marks': total_marks,
+        'total_votes': total_votes,
+        'rating': rating,
+        'score': weighted_score(total_marks, total_votes),
+        'version': F('version') + 1,
+        'updated_at': Now(),
+    }
+
+
+# Взвешенный (байесовский) рейтинг: к оценкам питомца добавляется PRIOR_WEIGHT условных голосов
+# со средней оценкой PRIOR_MEAN, поэтому питомцы с малым числом голосов не занимают верх таблицы.
+# Принимает как числа, так и выражения БД
+def weighted_score(total_marks, total_votes):
+    prior_mean = settings.LEADERBOARD['PRIOR_MEAN']
+    prior_weight = settings.LEADERBOARD['PRIOR_WEIGHT']
+    if isinstance(total_marks, int) and isinstance(total_votes, int):
+        return (prior_mean * prior_weight + total_marks) / (prior_weight + total_votes)
+    return ((Value(prior_mean * prior_weight) + Cast(total_marks, models.FloatField()))
+            / (Value(prior_weight) + total_votes))
+
+
+def default_score():
+    return weighted_score(0, 0)
 
 
 class Cat(models.Model):
@@ -19,18 +98,50 @@ class Cat(models.Model):
     rating = models.FloatField(default=0, verbose_name='Рейтинг животного')
     total_marks = models.PositiveIntegerField(default=0, verbose_name='Суммарная оценка')
     total_votes = models.PositiveIntegerField(default=0, verbose_name='Количество голосовавших')
+    score = models.FloatField(default=default_score, verbose_name='Взвешенный рейтинг животного')
+    # Версия записи, увеличивается при каждом изменении питомца и при голосовании
+    version = models.PositiveIntegerField(default=1, verbose_name='Версия записи')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время изменения')
+
+    objects = CatQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name} породы {self.breed}'
 
+    # Порода на момент загрузки из БД, чтобы при смене породы перенести статистику питомца
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_breed_id = instance.__dict__.get('breed_id')
+        return instance
+
     class Meta:
         verbose_name = 'Кошка'
         verbose_name_plural = 'Кошки'
+        # Индексы для курсорной пагинации списка питомцев
+        indexes = [
+            models.Index(fields=['breed', 'id'], name='show_cat_breed_id_idx'),
+            models.Index(fields=['rating', 'id'], name='show_cat_rating_id_idx'),
+            models.Index(fields=['breed', 'rating', 'id'], name='show_cat_breed_rating_id_idx'),
+            # Индексы для таблицы лидеров
+            models.Index(fields=['rating', 'total_votes', 'id'], name='show_cat_top_rating_idx'),
+            models.Index(fields=['breed', 'rating', 'total_votes', 'id'], name='show_cat_breed_top_rating_idx'),
+            models.Index(fields=['score', 'total_votes', 'id'], name='show_cat_top_score_idx'),
+            models.Index(fields=['breed', 'score', 'total_votes', 'id'], name='show_cat_breed_top_score_idx'),
+            # Индексы для фильтров списка питомцев по владельцу и окрасу с обеими сортировками
+            models.Index(fields=['owner', 'id'], name='show_cat_owner_id_idx'),
+            models.Index(fields=['owner', 'rating', 'id'], name='show_cat_owner_rating_id_idx'),
+            models.Index(fields=['color', 'id'], name='show_cat_color_id_idx'),
+            models.Index(fields=['color', 'rating', 'id'], name='show_cat_color_rating_id_idx'),
+        ]
 
 
 class Breed(models.Model):
     name = models.CharField(unique=True, max_length=128, verbose_name='Порода животного')
     description = models.CharField(max_length=512, verbose_name='Описание породы', blank=True)
+    # Версия записи, увеличивается при каждом изменении породы
+    version = models.PositiveIntegerField(default=1, verbose_name='Версия записи')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время изменения')
 
     def __str__(self):
         return f'Порода {self.name}'
@@ -40,10 +151,89 @@ class Breed(models.Model):
         verbose_name_plural = 'Породы'
 
 
+class BreedStatsQuerySet(models.QuerySet):
+    # Изменение статистики пород одним UPDATE запросом.
+    # deltas - словарь {id породы: (изменение количества питомцев, суммы оценок, количества голосов)}
+    def apply_deltas(self, deltas: dict) -> int:
+        deltas = {pk: delta for pk, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return 0
+        cat_count, total_marks, total_votes = [
+            F(field) + Case(*[When(pk=pk, then=Value(delta[index])) for pk, delta in deltas.items()],
+                            default=Value(0), output_field=models.IntegerField())
+            for index, field in enumerate(('cat_count', 'total_marks', 'total_votes'))
+        ]
+        return self.filter(pk__in=deltas).update(**breed_stats_fields(cat_count, total_marks, total_votes))
+
+    # Перенос голосов питомцев в статистику их пород одним UPDATE запросом с подзапросом к питомцам
+    # (без отдельного чтения пород). deltas - тот же словарь, что и в CatQuerySet.apply_vote_deltas
+    def apply_vote_deltas(self, deltas: dict) -> int:
+        if not deltas:
+            return 0
+        cats = Cat.objects.filter(pk__in=deltas, breed=OuterRef('pk')).order_by().values('breed')
+        marks, votes = [
+            Coalesce(Subquery(cats.annotate(total=Sum(Case(
+                *[When(pk=pk, then=Value(delta[index])) for pk, delta in deltas.items()],
+                default=Value(0), output_field=models.IntegerField()))).values('total')), 0)
+            for index in (0, 1)
+        ]
+        breeds = Cat.objects.filter(pk__in=deltas).values('breed')
+        return self.filter(pk__in=breeds).update(**breed_stats_fields(
+            F('cat_count'), F('total_marks') + marks, F('total_votes') + votes))
+
+    # Пересчет статистики всех пород заново по питомцам. Недостающие строки статистики создаются
+    def recompute(self) -> int:
+        BreedStats.objects.bulk_create([BreedStats(breed_id=breed_id)
+                                        for breed_id in Breed.objects.values_list('id', flat=True)],
+                                       ignore_conflicts=True)
+        cats = Cat.objects.filter(breed=OuterRef('pk')).order_by().values('breed')
+        cat_count, total_marks, total_votes = [
+            Coalesce(Subquery(cats.annotate(total=aggregate).values('total')), 0)
+            for aggregate in (Count('id'), Sum('total_marks'), Sum('total_votes'))
+        ]
+        return self.update(**breed_stats_fields(cat_count, total_marks, total_votes))
+
+
+# Значения полей статистики породы по выражениям количества питомцев, суммы оценок и количества голосов
+def breed_stats_fields(cat_count, total_marks, total_votes) -> dict:
+    return {
+        'cat_count': cat_count,
+        'total_marks': total_marks,
+        'total_votes': total_votes,
+        'rating': Case(When(GreaterThan(total_votes, 0),
+                            then=Cast(total_marks, models.FloatField()) / total_votes),
+                       default=Value(0.0), output_field=models.FloatField()),
+    }
+
+
+# Статистика породы, поддерживаемая при изменениях питомцев и голосовании,
+# чтобы обзор пород читался без обхода всех питомцев
+class BreedStats(models.Model):
+    breed = models.OneToOneField(Breed, on_delete=models.CASCADE, primary_key=True, related_name='stats',
+                                 verbose_name='Порода')
+    cat_count = models.IntegerField(default=0, verbose_name='Количество питомцев')
+    total_marks = models.IntegerField(default=0, verbose_name='Суммарная оценка')
+    total_votes = models.IntegerField(default=0, verbose_name='Количество голосов')
+    # Средняя оценка по всем голосам за питомцев породы
+    rating = models.FloatField(default=0, verbose_name='Средняя оценка')
+
+    objects = BreedStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'Статистика {self.breed_id}'
+
+    class Meta:
+        verbose_name = 'Статистика породы'
+        verbose_name_plural = 'Статистика пород'
+
+
 class Vote(models.Model):
     value = models.PositiveSmallIntegerField(verbose_name='Оценка',)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     cat = models.ForeignKey('Cat', on_delete=models.CASCADE)
+    # False - голос сохранен в режиме отложенного пересчета и еще не учтен в рейтинге питомца
+    is_counted = models.BooleanField(default=True, verbose_name='Учтен в рейтинге')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время голосования')
 
     def __str__(self):
         return f'{self.value} за {self.cat.name}'
@@ -51,3 +241,10 @@ class Vote(models.Model):
         verbose_name = 'Голос'
         verbose_name_plural = 'Голоса'
         unique_together = ('user', 'cat')
+        indexes = [
+            # Частичный индекс только по неучтенным голосам для быстрого переноса их в рейтинги
+            models.Index(fields=['id'], condition=models.Q(is_counted=False), name='show_vote_pending_idx'),
+            # Индексы для истории голосов питомца и пользователя (новые первыми)
+            models.Index(fields=['cat', 'created_at', 'id'], name='show_vote_cat_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='show_vote_user_created_idx'),
+        ]
@@ -0,0 +1,107 @@
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+# Курсорная пагинация по составному ключу. Сортировка всегда заканчивается уникальным id, а курсор хранит
+# значения всех полей сортировки последней записи страницы, поэтому следующая страница выбирается условием
+# (f1 > v1) OR (f1 = v1 AND f2 > v2) ... по индексу, без OFFSET на записях с одинаковым первым полем.
+# Стандартная CursorPagination позиционируется только по первому полю и на повторах переходит к OFFSET
+class KeysetCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        ordering = tuple(field[1:] if field.startswith('-') else f'-{field}'
+                         for field in self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = (self._get_position_from_instance(results[-1], self.ordering)
+                     if len(results) > self.page_size else None)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    # Условие "после позиции" в порядке ordering. Первое поле дополнительно ограничено нестрогим
+    # неравенством, чтобы БД начинала чтение индекса с позиции, а не с начала
+    @staticmethod
+    def _after(ordering, position: str) -> Q:
+        values = json.loads(position)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError('Некорректная позиция курсора')
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        condition = Q()
+        for index, (field, descending) in enumerate(fields):
+            equal = {name: value for (name, _), value in zip(fields[:index], values)}
+            condition |= Q(**equal, **{f'{field}__{"lt" if descending else "gt"}': values[index]})
+        field, descending = fields[0]
+        return Q(**{f'{field}__{"lte" if descending else "gte"}': values[0]}) & condition
+
+    # Значения всех полей сортировки записи (модели или строки .values()) в виде JSON списка
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        return json.dumps(values)
+
+
+# Курсорная пагинация списка питомцев.
+# Позиция страницы кодируется в непрозрачный курсор, поэтому глубокие страницы
+# выбираются по индексу (WHERE id > позиция) без OFFSET сканирования таблицы
+class CatCursorPagination(KeysetCursorPagination):
+    page_size = settings.CATS_PAGE_SIZE
+    max_page_size = settings.CATS_MAX_PAGE_SIZE
+    ordering_query_param = 'ordering'
+    # Допустимые варианты сортировки. Сортировка по рейтингу дополняется id, который входит в курсор
+    orderings = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'rating': ('rating', 'id'),
+        '-rating': ('-rating', '-id'),
+    }
+    ordering = orderings['id']
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get(self.ordering_query_param)
+        return self.orderings.get(key, self.ordering)
+
+
+# Курсорная пагинация истории голосов: новые голоса первыми, страница выбирается
+# по индексам (cat, created_at, id)/ (user, created_at, id)
+class VoteCursorPagination(KeysetCursorPagination):
+    page_size = settings.VOTES_PAGE_SIZE
+    max_page_size = settings.VOTES_MAX_PAGE_SIZE
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,63 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Cat
+
+# Виртуальная FTS5 таблица поиска питомцев (создается миграцией 0007 только на SQLite с FTS5)
+SEARCH_TABLE = 'show_cat_search'
+
+# Веса колонок name, description, color, breed_name при ранжировании bm25
+SEARCH_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+
+_WORD = re.compile(r'\w+')
+
+# Наличие таблицы поиска по базам данных (проверяется один раз за процесс)
+_fts_tables = {}
+
+
+def search_terms(query: str) -> list:
+    return _WORD.findall(query)
+
+
+def fts_available() -> bool:
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_tables[name]
+
+
+# Запрос FTS5: каждое слово ищется по префиксу, все слова должны найтись (в любых колонках)
+def match_expression(terms: list) -> str:
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+# Поиск питомцев по кличке, описанию, окрасу и названию породы.
+# Возвращает общее количество найденных и id питомцев страницы в порядке релевантности.
+# Без FTS5 используется поиск icontains по тем же полям с сортировкой по рейтингу
+def search_cats(query: str, limit: int, offset: int) -> tuple:
+    terms = search_terms(query)
+    if not terms:
+        return 0, []
+
+    if fts_available():
+        expression = match_expression(terms)
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+            count = cursor.fetchone()[0]
+            cursor.execute(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                           f'ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s OFFSET %s',
+                           [expression, limit, offset])
+            return count, [row[0] for row in cursor.fetchall()]
+
+    condition = Q()
+    for term in terms:
+        condition &= (Q(name__icontains=term) | Q(description__icontains=term) |
+                      Q(color__icontains=term) | Q(breed__name__icontains=term))
+    queryset = Cat.objects.filter(condition)
+    ids = list(queryset.order_by('-rating', 'id').values_list('id', flat=True)[offset:offset + limit])
+    return queryset.count(), ids
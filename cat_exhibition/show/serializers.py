@@ -1,7 +1,9 @@
 from django.core import validators
+from django.db import transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from .models import Cat, Breed, Vote
+from .models import Cat, Breed, BreedStats, Vote, MAX_ID
 from accounts.serializers import UserSerializer
 
 
@@ -9,20 +11,64 @@ class BreedSerializer(serializers.ModelSerializer):
     class Meta:
         model = Breed
         fields = '__all__'
+        read_only_fields = ['version']
+
+
+# Статистика породы с ее названием
+class BreedStatsSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='breed.name', read_only=True)
+
+    class Meta:
+        model = BreedStats
+        fields = ['breed', 'name', 'cat_count', 'total_marks', 'total_votes', 'rating']
 
 
 class CatSerializer(serializers.ModelSerializer):
     # Поля для большей информативности
-    breed_info = BreedSerializer(read_only=True, source='breed')
+    # Данные породы берутся из кэша пород, переданного в context['breeds'], без JOIN к таблице пород
+    breed_info = serializers.SerializerMethodField()
     owner_info = UserSerializer(read_only=True, source='owner')
     total_marks = serializers.IntegerField(read_only=True, default=0)
     total_votes = serializers.IntegerField(read_only=True, default=0)
     rating = serializers.IntegerField(read_only=True, default=0)
+    score = serializers.FloatField(read_only=True)
     age = serializers.IntegerField(default=12)
 
     class Meta:
         model = Cat
         fields = '__all__'
+        # Владелец всегда устанавливается из request.user при сохранении
+        read_only_fields = ['version', 'owner']
+
+    # Сохраняются только переданные поля, версия и время изменения: суммы оценок и рейтинг,
+    # прочитанные до параллельных голосов, не записываются обратно. Они перечитываются для ответа
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        with transaction.atomic():
+            instance.save(update_fields=[*validated_data, 'version', 'updated_at'])
+        instance.refresh_from_db(fields=['total_marks', 'total_votes', 'rating', 'score'])
+        return instance
+
+    @extend_schema_field(BreedSerializer)
+    def get_breed_info(self, obj):
+        breeds = self.context.get('breeds')
+        if breeds is not None and obj.breed_id in breeds:
+            return breeds[obj.breed_id]
+        return BreedSerializer(obj.breed).data
+
+
+class LeaderboardEntrySerializer(CatSerializer):
+    # Место питомца в таблице лидеров
+    rank = serializers.IntegerField(read_only=True)
+
+
+# Страница результатов поиска питомцев
+class CatSearchResponseSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = CatSerializer(many=True)
 
 
 class CatCreationSerializer(serializers.ModelSerializer):
@@ -33,10 +79,28 @@ class CatCreationSerializer(serializers.ModelSerializer):
         fields = ['name', 'description', 'age', 'breed', 'color']
 
 
+class CatBulkItemSerializer(CatCreationSerializer):
+    # Существование пород проверяется по словарю context['breeds'], загруженному одним запросом на весь пакет
+    breed = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+
+    def validate_breed(self, value):
+        if value not in self.context['breeds']:
+            raise serializers.ValidationError(f'Порода с id={value} не найдена.')
+        return value
+
+
+class CatBulkErrorResponseSerializer(serializers.Serializer):
+    error = serializers.CharField(default='Введенные данные некорректны')
+    results = serializers.ListField(child=serializers.DictField(),
+                                    help_text='Ошибки по каждому питомцу в порядке запроса, {} - ошибок нет')
+
+
 class VoteSerializer(serializers.ModelSerializer):
     cat = CatSerializer(read_only=True)
     user = UserSerializer(read_only=True)
-    value = serializers.IntegerField(validators=[validators.MaxValueValidator(5,
+    value = serializers.IntegerField(validators=[validators.MinValueValidator(0,
+                                                                              message='Значение должно быть от 0 до 5'),
+                                                 validators.MaxValueValidator(5,
                                                                               message='Значение должно быть от 0 до 5')])
 
     class Meta:
@@ -44,6 +108,38 @@ class VoteSerializer(serializers.ModelSerializer):
         fields = ['value', 'user', 'cat']
 
 
+# Голос в истории голосов: только id питомца и пользователя, без вложенных сериализаторов.
+# Имена пользователей страницы передаются в context['usernames'] словарем {id: username}
+class VoteHistorySerializer(serializers.ModelSerializer):
+    username = serializers.SerializerMethodField()
+
+    def get_username(self, vote) -> str:
+        return self.context['usernames'].get(vote.user_id)
+
+    class Meta:
+        model = Vote
+        fields = ['id', 'value', 'cat', 'user', 'username', 'is_counted', 'created_at']
+
+
+class VoteBatchItemSerializer(serializers.Serializer):
+    cat_id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    value = serializers.IntegerField(validators=[validators.MinValueValidator(0,
+                                                                              message='Значение должно быть от 0 до 5'),
+                                                 validators.MaxValueValidator(5,
+                                                                              message='Значение должно быть от 0 до 5')])
+
+
+class VoteBatchResultSerializer(serializers.Serializer):
+    cat_id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    value = serializers.IntegerField()
+    status = serializers.IntegerField(help_text='201 - голос учтен, 404 - питомец не найден, 409 - вы уже голосовали')
+
+
+class VoteBatchResponseSerializer(serializers.Serializer):
+    message = serializers.CharField(default='Успешное выполнение операции')
+    results = VoteBatchResultSerializer(many=True)
+
+
 class SuccessResponseSerializer(serializers.Serializer):
     message = serializers.CharField(default='Успешное выполнение операции')
 
@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.expressions import Combinable
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_cats, invalidate_breeds
+from .models import Cat, Breed, BreedStats
+
+
+# Увеличение версии питомца или породы при каждом сохранении (для ETag). Версия увеличивается в самом UPDATE,
+# как и при голосовании: экземпляр мог быть загружен до параллельных изменений, и его версия устарела
+@receiver(pre_save, sender=Cat)
+@receiver(pre_save, sender=Breed)
+def bump_version(sender, instance, **kwargs):
+    if not instance._state.adding and not kwargs.get('raw'):
+        instance.version = F('version') + 1
+
+
+# Записанная версия вместо выражения после сохранения
+@receiver(post_save, sender=Cat)
+@receiver(post_save, sender=Breed)
+def refresh_version(sender, instance, **kwargs):
+    if isinstance(instance.version, Combinable):
+        instance.refresh_from_db(fields=['version'])
+
+
+# Инвалидация кэша ответов при изменении питомцев, в том числе через панель администрирования
+@receiver([post_save, post_delete], sender=Cat)
+def cat_changed(sender, instance, **kwargs):
+    invalidate_cats([instance.pk])
+
+
+# Инвалидация кэша ответов при изменении пород
+@receiver([post_save, post_delete], sender=Breed)
+def breed_changed(sender, instance, **kwargs):
+    invalidate_breeds()
+
+
+# Статистика новой породы
+@receiver(post_save, sender=Breed)
+def breed_created(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        BreedStats.objects.get_or_create(breed=instance)
+
+
+# Изменение статистики пород при добавлении питомца, смене его породы и удалении
+@receiver(post_save, sender=Cat)
+def cat_saved(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    loaded = getattr(instance, 'loaded_breed_id', None)
+    if created:
+        BreedStats.objects.apply_deltas({instance.breed_id: (1, instance.total_marks, instance.total_votes)})
+    elif loaded is not None and loaded != instance.breed_id:
+        # Переносятся суммы из БД: экземпляр мог быть загружен до параллельных голосов
+        stored = stored_stats(instance)
+        if stored is not None:
+            stats = (1, *stored[1:])
+            BreedStats.objects.apply_deltas({loaded: tuple(-value for value in stats), instance.breed_id: stats})
+    instance.loaded_breed_id = instance.breed_id
+
+
+# Статистика удаляемого питомца вычитается по значениям из БД до удаления (внутри транзакции удаления)
+@receiver(pre_delete, sender=Cat)
+def cat_deleted(sender, instance, **kwargs):
+    stored = stored_stats(instance)
+    if stored is not None:
+        breed_id, total_marks, total_votes = stored
+        BreedStats.objects.apply_deltas({breed_id: (-1, -total_marks, -total_votes)})
+
+
+# Порода и суммы питомца из БД. Внутри транзакции строка блокируется до ее конца (там, где БД это поддерживает)
+def stored_stats(instance):
+    cats = Cat.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        cats = cats.select_for_update()
+    return cats.values_list('breed_id', 'total_marks', 'total_votes').first()
@@ -1,10 +1,35 @@
+import gzip
 import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
-from .models import Breed, Cat, Vote
+from accounts.authentication import get_user_cache, user_cache_key
+from accounts.blacklist import blacklist_filter, get_blacklist_cache
+from cat_exhibition.metrics import registry
+from cat_exhibition.profiling import normalize_sql, slow_query_log
+from cat_exhibition.schema import schema_store
+
+from .breed_cache import breed_cache
+from .cache import get_cache, get_stats
+from .fast_serializers import FastCatSerializer, CAT_VALUES
+from .filters import CatFilterSet
+from .management.commands.reconcile_ratings import chunk_bounds
+from .models import Breed, BreedStats, Cat, Vote
+from .pagination import CatCursorPagination
+from .serializers import CatSerializer
 
 
 class TestExhibition(TestCase):
@@ -86,6 +111,20 @@ class TestExhibition(TestCase):
         Cat.objects.create(**cls.cat_data_4)
         Vote.objects.create(value=5, user_id=1, cat_id=2)
 
+    # Выполнение перед каждым тестом: очистка кэша ответов и множества отозванных токенов от данных предыдущих тестов
+    def setUp(self):
+        get_cache().clear()
+        blacklist_filter.clear()
+
+    # Выполнение запроса с проверкой, что количество SQL запросов не превышает бюджет
+    def assert_query_budget(self, budget, method, url, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, *args, **kwargs)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(len(context), budget,
+                             f'{method.upper()} {url}: {len(context)} SQL запросов при бюджете {budget}\n{queries}')
+        return response
+
     # Проверка функции регистрации при правильном вводе данных
     def test_signup_success(self):
         response = self.client.post(f'/{self.auth_url}signup/', self.user_data_3)
@@ -131,6 +170,62 @@ class TestExhibition(TestCase):
         response = self.client.get(f'/{self.api_url}breeds/', )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    # Проверка метода получения списка питомцев
+    def test_cat_getting_success(self):
+        response = self.client.get(f'/{self.api_url}cats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get('results')), 4)
+        self.assertIsNone(response.data.get('next'))
+
+    # Проверка постраничного получения списка питомцев по курсору
+    def test_cat_getting_pagination(self):
+        response = self.client.get(f'/{self.api_url}cats/', {'page_size': 3})
+        self.assertEqual([cat['id'] for cat in response.data.get('results')], [1, 2, 3])
+        response = self.client.get(response.data.get('next'))
+        self.assertEqual([cat['id'] for cat in response.data.get('results')], [4])
+        self.assertIsNotNone(response.data.get('previous'))
+
+    # Проверка постраничного получения по рейтингу при одинаковых рейтингах: страницы выбираются
+    # по составному курсору (рейтинг, id) без OFFSET, в обе стороны без пропусков и повторов
+    def test_cat_getting_pagination_rating_ties(self):
+        url = f'/{self.api_url}cats/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'ordering': 'rating', 'page_size': 1})
+            pages = [[cat['id'] for cat in response.data.get('results')]]
+            while response.data.get('next'):
+                response = self.client.get(response.data.get('next'))
+                pages.append([cat['id'] for cat in response.data.get('results')])
+        self.assertEqual(pages, [[1], [2], [3], [4]])
+        self.assertFalse([query['sql'] for query in context.captured_queries if 'OFFSET' in query['sql']])
+        response = self.client.get(response.data.get('previous'))
+        self.assertEqual([cat['id'] for cat in response.data.get('results')], [3])
+        response = self.client.get(url, {'cursor': 'cD1bImEiXQ=='})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Проверка получения списка питомцев с сортировкой по рейтингу и фильтром по породе
+    def test_cat_getting_ordering(self):
+        Cat.objects.filter(id=1).update(rating=4)
+        response = self.client.get(f'/{self.api_url}cats/', {'ordering': '-rating', 'breed_id': self.breed_1.id})
+        self.assertEqual([cat['id'] for cat in response.data.get('results')], [1, 2])
+
+    # Проверка количества SQL запросов при получении списка питомцев вне зависимости от их числа
+    def test_cat_getting_query_budget(self):
+        # Запрос страницы питомцев и загрузка кэша пород, версии для ETag берутся из поколений кэша
+        self.assert_query_budget(2, 'get', f'/{self.api_url}cats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(10):
+                owner = User.objects.create_user(username=f'owner_{i}')
+                breed = Breed.objects.create(name=f'Порода {i}')
+                Cat.objects.create(name=f'Cat {i}', color='Белый', description='', age=1, breed=breed, owner=owner)
+        response = self.assert_query_budget(2, 'get', f'/{self.api_url}cats/')
+        self.assertEqual(len(response.data.get('results')), 14)
+
+    # Проверка количества SQL запросов при получении питомца
+    def test_cat_retrieving_query_budget(self):
+        # Запрос версий, загрузка кэша пород, запрос питомца
+        response = self.assert_query_budget(3, 'get', f'/{self.api_url}cats/{self.cat_1.id}/')
+        self.assertEqual(response.data.get('owner_info').get('id'), self.owner_1.id)
+
     # Проверка метода создания питомца
     def test_cat_creation_success(self):
         response = self.client.post(f'/{self.api_url}cats/',
@@ -163,6 +258,23 @@ class TestExhibition(TestCase):
                                      )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    # Проверка версии питомца при обновлении экземпляра, загруженного до голосования:
+    # версия увеличивается относительно записанной в БД, а не устаревшей в экземпляре
+    def test_cat_update_version_after_vote(self):
+        cat = Cat.objects.get(id=self.cat_1.id)
+        Cat.objects.apply_vote_deltas({cat.id: (5, 1)})
+        voted_version = Cat.objects.get(id=cat.id).version
+        serializer = CatSerializer(instance=cat, data=self.cat_data_7)
+        self.assertTrue(serializer.is_valid())
+        serializer.save(owner=self.owner_1)
+        self.assertEqual(Cat.objects.get(id=cat.id).version, voted_version + 1)
+        self.assertEqual(serializer.data['version'], voted_version + 1)
+
+        breed = Breed.objects.get(id=self.breed_1.id)
+        breed.description = 'Новое описание'
+        breed.save()
+        self.assertEqual(breed.version, Breed.objects.get(id=breed.id).version)
+
     # Проверка метода обновления данных питомца для чужого хозяина
     def test_cat_update_failed_1(self):
         response = self.client.put(f'/{self.api_url}cats/{self.cat_1.id}/',
@@ -219,6 +331,15 @@ class TestExhibition(TestCase):
                                     )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    # Проверка метода выставления оценки питомцу без оценки, с нечисловой и отрицательной оценкой
+    def test_vote_for_cat_failed_4(self):
+        for data in ({}, {'value': 'five'}, {'value': -1}):
+            response = self.client.post(f'/{self.api_url}voting/{self.cat_2.id}/',
+                                        data,
+                                        headers={'authorization': f'Bearer {self.user_1.data.get("access")}', }
+                                        )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     # Проверка метода выставления повторной оценки питомцу
     def test_vote_for_cat_failed_2(self):
 
@@ -226,4 +347,711 @@ class TestExhibition(TestCase):
                                     {'value': 3},
                                     headers={'authorization': f'Bearer {self.user_1.data.get("access")}', }
                                     )
-        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    # Проверка пересчета рейтинга питомца при голосовании
+    def test_vote_for_cat_rating(self):
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                         {'value': 4},
+                         headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                         {'value': 1},
+                         headers={'authorization': f'Bearer {self.user_2.data.get("access")}', })
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes, cat.rating), (5, 2, 2.5))
+
+    # Проверка выставления оценки несуществующему питомцу
+    def test_vote_for_cat_failed_3(self):
+        response = self.client.post(f'/{self.api_url}voting/100/',
+                                    {'value': 3},
+                                    headers={'authorization': f'Bearer {self.user_1.data.get("access")}', }
+                                    )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Vote.objects.filter(cat_id=100).exists())
+
+    # Проверка отката пересчета рейтинга при повторной оценке питомцу
+    def test_vote_for_cat_conflict_rollback(self):
+        self.client.post(f'/{self.api_url}voting/{self.cat_2.id}/',
+                         {'value': 3},
+                         headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        cat = Cat.objects.get(id=self.cat_2.id)
+        self.assertEqual((cat.total_marks, cat.total_votes), (0, 0))
+
+    # Проверка изменения оценки питомцу с поправкой рейтинга и статистики породы на разницу
+    def test_vote_change(self):
+        Cat.objects.apply_vote_deltas({self.cat_2.id: (5, 1)})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.assert_query_budget(7, 'put', f'/{self.api_url}voting/{self.cat_2.id}/',
+                                                {'value': 3},
+                                                content_type='application/json',
+                                                headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cat = Cat.objects.get(id=self.cat_2.id)
+        self.assertEqual((cat.total_marks, cat.total_votes, cat.rating), (3, 1, 3))
+        self.assertEqual(Vote.objects.get(cat_id=self.cat_2.id, user_id=1).value, 3)
+        self.assertEqual(BreedStats.objects.get(breed=self.breed_1).total_marks, 3)
+
+        for value in (30, -1):
+            response = self.client.put(f'/{self.api_url}voting/{self.cat_2.id}/',
+                                       {'value': value},
+                                       content_type='application/json',
+                                       headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.put(f'/{self.api_url}voting/{self.cat_1.id}/',
+                                   {'value': 3},
+                                   content_type='application/json',
+                                   headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Проверка отзыва оценки питомцу
+    def test_vote_withdraw(self):
+        Cat.objects.apply_vote_deltas({self.cat_2.id: (5, 1)})
+        response = self.client.delete(f'/{self.api_url}voting/{self.cat_2.id}/',
+                                      headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cat = Cat.objects.get(id=self.cat_2.id)
+        self.assertEqual((cat.total_marks, cat.total_votes, cat.rating), (0, 0, 0))
+        self.assertEqual(BreedStats.objects.get(breed=self.breed_1).total_votes, 0)
+        response = self.client.delete(f'/{self.api_url}voting/{self.cat_2.id}/',
+                                      headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Проверка изменения и отзыва неучтенного голоса: рейтинг питомца не меняется до переноса голосов
+    def test_vote_change_uncounted(self):
+        Vote.objects.create(value=4, user_id=2, cat_id=self.cat_1.id, is_counted=False)
+        self.client.put(f'/{self.api_url}voting/{self.cat_1.id}/',
+                        {'value': 1},
+                        content_type='application/json',
+                        headers={'authorization': f'Bearer {self.user_2.data.get("access")}', })
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes), (0, 0))
+        call_command('flush_votes', stdout=open(os.devnull, 'w'))
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes), (1, 1))
+
+    # Проверка пакетного голосования с отчетом по каждому питомцу
+    def test_vote_batch_success(self):
+        data = json.dumps([{'cat_id': self.cat_1.id, 'value': 4},
+                           {'cat_id': self.cat_2.id, 'value': 2},
+                           {'cat_id': 100, 'value': 3},
+                           {'cat_id': 3, 'value': 5},
+                           {'cat_id': 3, 'value': 1}])
+        response = self.assert_query_budget(8, 'post', f'/{self.api_url}voting/batch/',
+                                            data,
+                                            content_type='application/json',
+                                            headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data.get('results')],
+                         [status.HTTP_201_CREATED, status.HTTP_409_CONFLICT, status.HTTP_404_NOT_FOUND,
+                          status.HTTP_201_CREATED, status.HTTP_409_CONFLICT])
+        cats = Cat.objects.in_bulk([self.cat_1.id, 3])
+        self.assertEqual((cats[self.cat_1.id].total_marks, cats[self.cat_1.id].rating), (4, 4))
+        self.assertEqual((cats[3].total_marks, cats[3].total_votes), (5, 1))
+
+    # Проверка пакетного голосования с некорректной оценкой
+    def test_vote_batch_failed(self):
+        data = json.dumps([{'cat_id': self.cat_1.id, 'value': 4}, {'cat_id': 3, 'value': 40}])
+        response = self.client.post(f'/{self.api_url}voting/batch/',
+                                    data,
+                                    content_type='application/json',
+                                    headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for cat_id in (0, 2 ** 63, 99999999999999999999):
+            response = self.client.post(f'/{self.api_url}voting/batch/',
+                                        json.dumps([{'cat_id': cat_id, 'value': 4}]),
+                                        content_type='application/json',
+                                        headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Vote.objects.filter(cat_id=self.cat_1.id).exists())
+
+    # Проверка отложенного пересчета рейтинга после накопления голосов
+    @override_settings(VOTES_WRITE_BEHIND={'ENABLED': True, 'FLUSH_INTERVAL_MS': 60000,
+                                           'FLUSH_SIZE': 2, 'FLUSH_BATCH_SIZE': 1000})
+    def test_vote_write_behind(self):
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                         {'value': 4},
+                         headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes), (0, 0))
+        self.assertFalse(Vote.objects.get(cat_id=self.cat_1.id, user_id=1).is_counted)
+
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                         {'value': 1},
+                         headers={'authorization': f'Bearer {self.user_2.data.get("access")}', })
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes, cat.rating), (5, 2, 2.5))
+        self.assertFalse(Vote.objects.filter(is_counted=False).exists())
+
+    # Проверка команды принудительного переноса неучтенных голосов в рейтинги
+    def test_flush_votes_command(self):
+        Vote.objects.create(value=3, user_id=2, cat_id=self.cat_2.id, is_counted=False)
+        Vote.objects.create(value=4, user_id=2, cat_id=self.cat_1.id, is_counted=False)
+        call_command('flush_votes', stdout=open(os.devnull, 'w'))
+        cats = Cat.objects.in_bulk([self.cat_1.id, self.cat_2.id])
+        self.assertEqual((cats[self.cat_1.id].total_marks, cats[self.cat_1.id].total_votes), (4, 1))
+        self.assertEqual((cats[self.cat_2.id].total_marks, cats[self.cat_2.id].total_votes), (3, 1))
+        call_command('flush_votes', stdout=open(os.devnull, 'w'))
+        self.assertEqual(Cat.objects.get(id=self.cat_1.id).total_votes, 1)
+
+    # Проверка таблицы лидеров по средней оценке и по взвешенному рейтингу
+    def test_leaderboard_success(self):
+        Cat.objects.apply_vote_deltas({self.cat_1.id: (5, 1), 3: (9, 2)})
+        response = self.assert_query_budget(2, 'get', f'/{self.api_url}leaderboard/')
+        self.assertEqual([(cat['id'], cat['rank']) for cat in response.data],
+                         [(self.cat_1.id, 1), (3, 2), (4, 3), (self.cat_2.id, 3)])
+        response = self.client.get(f'/{self.api_url}leaderboard/', {'by': 'score', 'limit': 2})
+        self.assertEqual([cat['id'] for cat in response.data], [3, self.cat_1.id])
+        self.assertAlmostEqual(response.data[0]['score'], 24 / 7)
+        response = self.client.get(f'/{self.api_url}leaderboard/', {'breed_id': self.breed_2.id})
+        self.assertEqual([cat['id'] for cat in response.data], [3, 4])
+
+    # Проверка таблицы лидеров с некорректными параметрами
+    def test_leaderboard_failed(self):
+        response = self.client.get(f'/{self.api_url}leaderboard/', {'limit': 'all'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f'/{self.api_url}leaderboard/', {'breed_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Проверка кэширования списка питомцев и его инвалидации при изменении питомца
+    def test_cat_getting_cache(self):
+        self.client.get(f'/{self.api_url}cats/')
+        # Ответ и версии для ETag берутся из кэша без запросов к БД
+        response = self.assert_query_budget(0, 'get', f'/{self.api_url}cats/')
+        self.assertEqual(len(response.data.get('results')), 4)
+        self.assertGreaterEqual(get_stats()['cats-list']['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/{self.api_url}cats/{self.cat_1.id}/',
+                               headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        response = self.client.get(f'/{self.api_url}cats/')
+        self.assertEqual(len(response.data.get('results')), 3)
+
+    # Проверка инвалидации кэшированного питомца при голосовании за него
+    def test_cat_retrieving_cache(self):
+        self.client.get(f'/{self.api_url}cats/{self.cat_1.id}/')
+        # Тот же питомец по id с ведущим нулем кэшируется под тем же числовым id
+        self.client.get(f'/{self.api_url}cats/0{self.cat_1.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                             {'value': 4},
+                             headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        for url in [f'/{self.api_url}cats/{self.cat_1.id}/', f'/{self.api_url}cats/0{self.cat_1.id}/']:
+            response = self.client.get(url)
+            self.assertEqual(response.data.get('total_votes'), 1)
+        for pk in ['abc', 2 ** 63]:
+            response = self.client.get(f'/{self.api_url}cats/{pk}/')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Проверка инвалидации кэшированного списка пород при добавлении породы
+    def test_breed_getting_cache(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.get(f'/{self.api_url}breeds/', headers=headers)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/{self.api_url}breeds/', self.breed_data_4, headers=headers)
+        response = self.client.get(f'/{self.api_url}breeds/', headers=headers)
+        self.assertEqual(len(response.data), 4)
+
+    # Проверка ответа 304 на повторный запрос питомца с ETag и его изменения после голосования
+    def test_cat_retrieving_not_modified(self):
+        response = self.client.get(f'/{self.api_url}cats/{self.cat_1.id}/')
+        etag = response.headers['ETag']
+        response = self.assert_query_budget(1, 'get', f'/{self.api_url}cats/{self.cat_1.id}/',
+                                            headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/',
+                         {'value': 4},
+                         headers={'authorization': f'Bearer {self.user_1.data.get("access")}', })
+        response = self.client.get(f'/{self.api_url}cats/{self.cat_1.id}/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    # Проверка ответа 304 на повторный запрос списков по ETag и Last-Modified
+    def test_lists_not_modified(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        for url in [f'/{self.api_url}cats/', f'/{self.api_url}leaderboard/', f'/{self.api_url}breeds/']:
+            response = self.client.get(url, headers=headers)
+            etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+            response = self.client.get(url, headers={**headers, 'if-none-match': etag})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            response = self.client.get(url, headers={**headers, 'if-modified-since': last_modified})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(f'/{self.api_url}cats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Cat.objects.create(**self.cat_data_1)
+        response = self.client.get(f'/{self.api_url}cats/', headers={'if-none-match': response.headers['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Удаление питомца меняет время изменения списка
+        response = self.client.get(f'/{self.api_url}cats/')
+        last_modified = response.headers['Last-Modified']
+        with mock.patch('time.time_ns', return_value=time.time_ns() + 5 * 10 ** 9), \
+                self.captureOnCommitCallbacks(execute=True):
+            Cat.objects.get(id=self.cat_1.id).delete()
+        response = self.client.get(f'/{self.api_url}cats/', headers={'if-modified-since': last_modified})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.cat_1.id, [cat['id'] for cat in response.data['results']])
+
+    # Проверка проверки свежести списка питомцев без запросов к таблице питомцев
+    def test_list_not_modified_queries(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        response = self.client.get(f'/{self.api_url}cats/', headers=headers)
+        # Остается только запрос пользователя при аутентификации
+        response = self.assert_query_budget(1, 'get', f'/{self.api_url}cats/',
+                                            headers={**headers, 'if-none-match': response.headers['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    # Проверка получения пород и данных пород питомцев из кэша пород без запросов к БД
+    def test_breed_cache(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.get(f'/{self.api_url}breeds/', headers=headers)
+        # Остается только запрос пользователя при аутентификации
+        response = self.assert_query_budget(1, 'get', f'/{self.api_url}breeds/', headers=headers)
+        self.assertEqual([breed['name'] for breed in response.data],
+                         [self.breed_data_1['name'], self.breed_data_2['name'], self.breed_data_3['name']])
+        response = self.client.get(f'/{self.api_url}cats/{self.cat_1.id}/')
+        self.assertEqual(response.data.get('breed_info').get('name'), self.breed_data_1['name'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            breed = Breed.objects.get(id=self.breed_1.id)
+            breed.name = 'Невская'
+            breed.save()
+        response = self.client.get(f'/{self.api_url}cats/', {'breed_id': self.breed_1.id})
+        self.assertEqual(response.data.get('results')[0].get('breed_info').get('name'), 'Невская')
+
+    # Проверка совпадения JSON быстрого сериализатора и CatSerializer
+    def test_fast_cat_serializer(self):
+        Cat.objects.apply_vote_deltas({self.cat_1.id: (9, 2)})
+        cats = Cat.objects.select_related('breed', 'owner').order_by('id')
+        expected = JSONRenderer().render(CatSerializer(cats, many=True).data)
+        rows = Cat.objects.order_by('id').values(*CAT_VALUES)
+        self.assertEqual(JSONRenderer().render(FastCatSerializer(breed_cache.get()).many(rows)), expected)
+
+    # Получение access токена администратора
+    def get_admin_token(self):
+        User.objects.create_superuser(username='admin', password='admin1234')
+        response = self.client.post(f'/{self.auth_url}login/', {'username': 'admin', 'password': 'admin1234'})
+        return response.data.get('access')
+
+    # Проверка потоковой выгрузки питомцев в JSON Lines и голосов в JSON массив
+    def test_export_success(self):
+        headers = {'authorization': f'Bearer {self.get_admin_token()}'}
+        response = self.client.get(f'/{self.api_url}export/cats/', headers=headers)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2, 3, 4])
+
+        response = self.client.get(f'/{self.api_url}export/votes/', {'layout': 'json'}, headers=headers)
+        votes = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([{key: value for key, value in vote.items() if key != 'created_at'} for vote in votes],
+                         [{'id': 1, 'value': 5, 'user': 1, 'cat': 2, 'is_counted': True}])
+        self.assertIn('created_at', votes[0])
+
+    # Проверка выгрузки для пользователя без прав администратора
+    def test_export_failed(self):
+        response = self.client.get(f'/{self.api_url}export/cats/',
+                                   headers={'authorization': f'Bearer {self.user_1.data.get("access")}'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # Проверка команды выгрузки питомцев в файл
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cats.json')
+            call_command('export_catalogue', 'cats', layout='json', output=path, stderr=open(os.devnull, 'w'))
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(json.load(file)), 4)
+
+    # Проверка массового импорта пород, питомцев и голосов с пересчетом рейтингов
+    def test_import_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            breeds = os.path.join(directory, 'breeds.csv')
+            cats = os.path.join(directory, 'cats.jsonl')
+            votes = os.path.join(directory, 'votes.csv')
+            with open(breeds, 'w', encoding='utf-8') as file:
+                file.write('name,description\nСфинкс,Бесшерстная\nСибирская,Повтор\n')
+            with open(cats, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({'name': 'Tom', 'color': 'Серый', 'description': 'Новый', 'age': 5,
+                                       'breed': 'Сфинкс', 'owner': 'Petrov'}) + '\n')
+                file.write(json.dumps({'name': 'Bad', 'color': 'Серый', 'description': 'Без породы', 'age': 5,
+                                       'breed': 'Нет', 'owner': 'Petrov'}) + '\n')
+            with open(votes, 'w', encoding='utf-8') as file:
+                file.write('user,cat_id,value\nPetrov,1,4\nIvanov,1,2\nIvanov,2,3\nIvanov,100,3\nPetrov,1,9\n'
+                           'Petrov,1,5\n')
+            output = StringIO()
+            call_command('import_exhibition', breeds=breeds, cats=cats, votes=votes, batch_size=2,
+                         stdout=output, stderr=open(os.devnull, 'w'))
+
+        # Повторные голоса (уже в БД и в файле) не считаются принятыми
+        self.assertIn('Голоса: прочитано 6, принято 2, ошибок 4', output.getvalue())
+
+        self.assertEqual(Breed.objects.count(), 4)
+        self.assertEqual(list(Cat.objects.filter(breed__name='Сфинкс').values_list('name', flat=True)), ['Tom'])
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.total_marks, cat.total_votes, cat.rating), (6, 2, 3))
+        # Голос Ivanov за питомца 2 уже был, рейтинг пересчитан по существующему голосу
+        cat = Cat.objects.get(id=self.cat_2.id)
+        self.assertEqual((cat.total_marks, cat.total_votes), (5, 1))
+
+    # Проверка массового добавления питомцев
+    def test_cat_bulk_creation_success(self):
+        litter = [{'name': f'Kitten {i}', 'description': 'Котенок', 'color': 'Белый', 'breed': self.breed_3.id}
+                  for i in range(5)]
+        # Пользователь, породы, точка сохранения, вставка, статистика пород, освобождение точки сохранения
+        response = self.assert_query_budget(6, 'post', f'/{self.api_url}cats/bulk/',
+                                            json.dumps(litter),
+                                            content_type='application/json',
+                                            headers={'authorization': f'Bearer {self.user_2.data.get("access")}'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([cat['owner'] for cat in response.data], [self.owner_2.id] * 5)
+        self.assertEqual(response.data[0]['breed_info']['name'], self.breed_data_3['name'])
+        self.assertEqual(Cat.objects.filter(breed=self.breed_3, owner=self.owner_2).count(), 5)
+
+    # Проверка массового добавления питомцев с некорректными данными одного из них
+    def test_cat_bulk_creation_failed(self):
+        litter = [{'name': 'Kitten', 'description': 'Котенок', 'color': 'Белый', 'breed': self.breed_3.id},
+                  {'name': 'Kitten', 'description': 'Котенок', 'color': 'Белый', 'breed': 100}]
+        response = self.client.post(f'/{self.api_url}cats/bulk/',
+                                    json.dumps(litter),
+                                    content_type='application/json',
+                                    headers={'authorization': f'Bearer {self.user_2.data.get("access")}'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results'][0], {})
+        self.assertIn('breed', response.data['results'][1])
+        self.assertFalse(Cat.objects.filter(name='Kitten').exists())
+
+        for breed in (2 ** 63, '99999999999999999999', '²'):
+            response = self.client.post(f'/{self.api_url}cats/bulk/',
+                                        json.dumps([{**litter[0], 'breed': breed}]),
+                                        content_type='application/json',
+                                        headers={'authorization': f'Bearer {self.user_2.data.get("access")}'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('breed', response.data['results'][0])
+
+    # Проверка, что повторный запрос с тем же токеном не загружает пользователя из БД
+    def test_cached_user_authentication(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.get(f'/{self.api_url}cats/', headers=headers)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/{self.api_url}cats/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in context.captured_queries if 'auth_user' in query['sql']])
+        # В кэше только нужные для аутентификации поля, без хеша пароля
+        cached = get_user_cache().get(user_cache_key(self.owner_1.id))
+        self.assertEqual(cached['username'], self.owner_1.username)
+        self.assertNotIn('password', cached)
+
+        # Создание питомца: проверка породы, вставка и статистика породы, без запросов пользователя
+        response = self.assert_query_budget(3, 'post', f'/{self.api_url}cats/', self.cat_data_5, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['owner'], self.owner_1.id)
+
+    # Проверка сброса кэша пользователя при его деактивации
+    def test_cached_user_deactivation(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.get(f'/{self.api_url}cats/', headers=headers)
+        self.owner_1.is_active = False
+        self.owner_1.save()
+        response = self.client.get(f'/{self.api_url}cats/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # Проверка отзыва refresh токена при выходе и обновлении без запросов к blacklist в БД
+    # при общем для процессов кэше
+    def test_token_blacklist(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}):
+            self.check_token_blacklist(queries=0)
+
+    # Проверка отзыва refresh токена запросом к БД при кэше в памяти процесса
+    def test_token_blacklist_local_cache(self):
+        self.check_token_blacklist(queries=1)
+
+    def check_token_blacklist(self, queries):
+        refresh = self.user_1.data.get('refresh')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/{self.auth_url}refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rotated = response.data.get('refresh')
+
+        # Повторное использование замененного токена отклоняется
+        response = self.client.post(f'/{self.auth_url}refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/{self.auth_url}logout/', {'refresh_token': rotated})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(f'/{self.auth_url}logout/', {'refresh_token': rotated})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(context), queries)
+
+    # Проверка догрузки отозванных токенов по времени отзыва с запасом на поздно зафиксированные записи
+    def test_blacklist_filter_overlap(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}):
+            self.assertFalse(blacklist_filter.contains('missing'))
+            token = OutstandingToken.objects.filter(user=self.owner_1).first()
+            blacklisted = BlacklistedToken.objects.create(token=token)
+            # Запись зафиксирована после загрузки, но со временем отзыва до нее
+            BlacklistedToken.objects.filter(id=blacklisted.id).update(
+                blacklisted_at=blacklisted.blacklisted_at - timedelta(seconds=30))
+            get_blacklist_cache().incr('accounts:blacklist:version')
+            self.assertTrue(blacklist_filter.contains(token.jti))
+
+    # Проверка удаления истекших токенов пачками
+    def test_prune_tokens_command(self):
+        self.client.post(f'/{self.auth_url}logout/', {'refresh_token': self.user_1.data.get('refresh')})
+        OutstandingToken.objects.filter(user=self.owner_1).update(expires_at='2000-01-01T00:00:00Z')
+        call_command('prune_tokens', batch_size=1, stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(OutstandingToken.objects.values_list('user_id', flat=True)), [self.owner_2.id])
+
+    # Проверка выдачи готовой OpenAPI схемы с ETag и сжатием
+    def test_cached_schema(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(SCHEMA_CACHE={'DIR': directory, 'CODE_VERSION': 'test'}):
+            schema_store.clear()
+            call_command('build_schema', stdout=open(os.devnull, 'w'))
+            self.assertEqual(sorted(os.listdir(directory)), ['openapi-test.json', 'openapi-test.yaml'])
+
+            response = self.client.get('/schema/', {'format': 'json'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('/api/cats/', json.loads(response.content)['paths'])
+            etag = response['ETag']
+            response = self.client.get('/schema/', {'format': 'json'}, headers={'if-none-match': etag})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+            # Сжатое представление имеет свой ETag
+            response = self.client.get('/schema/', {'format': 'json'},
+                                       headers={'accept-encoding': 'gzip', 'if-none-match': etag})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['ETag'], etag[:-1] + '-gzip"')
+            response = self.client.get('/schema/', headers={'accept-encoding': 'gzip'})
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn(b'openapi:', gzip.decompress(response.content))
+            schema_store.clear()
+
+    # Проверка сбора метрик запросов и их выдачи в формате Prometheus
+    def test_metrics(self):
+        config = {'ENABLED': True, 'TOKEN': 'secret', 'LATENCY_BUCKETS': (0.1, 1), 'QUERY_BUCKETS': (1, 5)}
+        with override_settings(METRICS=config):
+            registry.clear()
+            client = Client()
+            client.get(f'/{self.api_url}cats/')
+            client.get(f'/{self.api_url}cats/')
+            self.assertEqual(client.get('/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+            response = client.get('/metrics/', headers={'authorization': 'Bearer secret'})
+            metrics = response.content.decode()
+            registry.clear()
+        # Без токена метрики доступны только сотрудникам
+        with override_settings(METRICS={**config, 'TOKEN': ''}):
+            client = Client()
+            self.assertEqual(client.get('/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(client.get('/metrics/', headers={'authorization': 'Bearer '}).status_code,
+                             status.HTTP_401_UNAUTHORIZED)
+            client.force_login(User.objects.create_user(username='admin', is_staff=True))
+            self.assertEqual(client.get('/metrics/').status_code, status.HTTP_200_OK)
+            registry.clear()
+        self.assertIn('http_requests_total{route="cats-list",method="GET",status="200"} 2', metrics)
+        self.assertIn('http_request_duration_seconds_count{route="cats-list",method="GET"} 2', metrics)
+        self.assertIn('db_queries_per_request_bucket{route="cats-list",method="GET",le="+Inf"} 2', metrics)
+        self.assertRegex(metrics, r'cache_hits_total\{endpoint="cats-list"\} [1-9]')
+        # При выключенных метриках endpoint недоступен
+        self.assertEqual(self.client.get('/metrics/').status_code, status.HTTP_404_NOT_FOUND)
+
+    # Проверка журнала медленных запросов с нормализацией SQL и планом выполнения
+    def test_slow_query_log(self):
+        self.assertEqual(normalize_sql("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21"),
+                         'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?')
+        with override_settings(SLOW_QUERIES={'ENABLED': True, 'THRESHOLD_MS': 0, 'MAX_STATEMENTS': 10}), \
+                self.assertLogs('cat_exhibition.profiling', 'WARNING'):
+            slow_query_log.clear()
+            client = Client()
+            client.get(f'/{self.api_url}cats/{self.cat_1.id}/')
+            client.get(f'/{self.api_url}cats/{self.cat_2.id}/')
+            self.assertEqual(client.get('/profiling/slow-queries/').status_code, status.HTTP_401_UNAUTHORIZED)
+            client.force_login(User.objects.create_user(username='admin', is_staff=True))
+            report = json.loads(client.get('/profiling/slow-queries/').content)
+            slow_query_log.clear()
+        entry = next(entry for entry in report
+                     if 'FROM "show_cat"' in entry['sql'] and 'WHERE "show_cat"."id"' in entry['sql'])
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(entry['views'], ['cats-detail'])
+        self.assertEqual(entry['params'], ['<int>'])
+        self.assertTrue(any('show_cat' in line for line in entry['plan']))
+
+    # Проверка полнотекстового поиска питомцев по началу слов, названию породы и его изменению
+    def test_cat_search(self):
+        response = self.client.get(f'/{self.api_url}cats/search/', {'q': 'моло'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(cat['name'] for cat in response.data['results']), ['Mark', 'Sandy'])
+
+        response = self.client.get(f'/{self.api_url}cats/search/', {'q': 'британск', 'limit': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('offset=1', response.data['next'])
+
+        # Индекс поиска обновляется при изменении названия породы
+        with self.captureOnCommitCallbacks(execute=True):
+            self.breed_2.name = 'Мейн-кун'
+            self.breed_2.save()
+        response = self.client.get(f'/{self.api_url}cats/search/', {'q': 'мейн'})
+        self.assertEqual(sorted(cat['name'] for cat in response.data['results']), ['Billy', 'Helena'])
+
+        # Поиск без FTS5 (другие БД) дает тех же питомцев
+        with mock.patch('show.search.fts_available', return_value=False):
+            response = self.client.get(f'/{self.api_url}cats/search/', {'q': 'Мейн', 'limit': 5})
+        self.assertEqual(sorted(cat['name'] for cat in response.data['results']), ['Billy', 'Helena'])
+
+    # Проверка поиска без поискового запроса
+    def test_cat_search_failed(self):
+        response = self.client.get(f'/{self.api_url}cats/search/', {'q': ' ,'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Проверка фильтрации списка питомцев по нескольким полям
+    def test_cat_list_filters(self):
+        Cat.objects.apply_vote_deltas({self.cat_2.id: (5, 1)})
+        response = self.client.get(f'/{self.api_url}cats/', {'owner_id': self.owner_2.id, 'age_min': 14})
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Helena'])
+        response = self.client.get(f'/{self.api_url}cats/', {'color': 'Черный', 'age_max': 12})
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Mark'])
+        response = self.client.get(f'/{self.api_url}cats/', {'rating_min': 1, 'votes_min': 1})
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Sandy'])
+
+        response = self.client.get(f'/{self.api_url}cats/', {'age_min': 'old'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for params in ({'breed_id': 2 ** 63}, {'owner_id': -2 ** 63 - 1}, {'votes_min': 10 ** 20},
+                       {'rating_min': 'nan'}, {'rating_min': 'inf'}):
+            response = self.client.get(f'/{self.api_url}cats/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Проверка планов выполнения фильтров списка: фильтры на равенство и рейтинг при сортировке по нему
+    # ищутся по индексу, и ни одна комбинация фильтра и сортировки не сортирует всю выборку
+    def test_cat_list_filters_use_indexes(self):
+        values = {'breed_id': '1', 'owner_id': '1', 'color': 'Белый', 'age_min': '6', 'age_max': '12',
+                  'rating_min': '3', 'votes_min': '2'}
+        self.assertEqual(set(values), set(CatFilterSet.fields()))
+        for name, value in values.items():
+            for key, ordering in CatCursorPagination.orderings.items():
+                queryset = CatFilterSet.apply(Cat.objects.all(), {name: value}).order_by(*ordering)
+                plan = queryset[:20].explain()
+                if name in ('breed_id', 'owner_id', 'color') or (name == 'rating_min' and 'rating' in key):
+                    self.assertIn('SEARCH show_cat USING INDEX', plan, f'{name}, {key}:\n{plan}')
+                self.assertNotIn('TEMP B-TREE', plan, f'{name}, {key}:\n{plan}')
+
+    # Проверка статистики пород при добавлении, голосовании, смене породы и удалении питомцев
+    def test_breed_stats(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.post(f'/{self.api_url}cats/', self.cat_data_5, headers=headers)
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/', {'value': 4}, headers=headers)
+        cat = Cat.objects.get(id=self.cat_1.id)
+        cat.breed = self.breed_3
+        cat.save()
+        Cat.objects.get(id=self.cat_2.id).delete()
+
+        response = self.client.get(f'/{self.api_url}breeds/stats/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = {row['name']: (row['cat_count'], row['total_marks'], row['total_votes'], row['rating'])
+                 for row in response.data}
+        self.assertEqual(stats, {self.breed_data_1['name']: (0, 0, 0, 0),
+                                 self.breed_data_2['name']: (2, 0, 0, 0),
+                                 self.breed_data_3['name']: (2, 4, 1, 4)})
+
+    # Проверка изменения и удаления питомца, загруженного до параллельного голоса: суммы оценок
+    # не перезаписываются, а статистика пород переносится и вычитается по значениям из БД
+    def test_cat_update_concurrent_vote(self):
+        cat = Cat.objects.get(id=self.cat_1.id)
+        Cat.objects.apply_vote_deltas({self.cat_1.id: (5, 1)})
+        serializer = CatSerializer(instance=cat, data={'name': 'Marko', 'color': 'Черный', 'description': 'Молодой',
+                                                       'age': 11, 'breed': self.breed_2.id})
+        self.assertTrue(serializer.is_valid())
+        serializer.save(owner=self.owner_1)
+        self.assertEqual((serializer.data['total_marks'], serializer.data['total_votes']), (5, 1))
+        cat = Cat.objects.get(id=self.cat_1.id)
+        self.assertEqual((cat.name, cat.total_marks, cat.total_votes, cat.rating), ('Marko', 5, 1, 5))
+        stats = dict(BreedStats.objects.values_list('breed_id', 'total_marks'))
+        self.assertEqual((stats[self.breed_1.id], stats[self.breed_2.id]), (0, 5))
+
+        Cat.objects.apply_vote_deltas({self.cat_1.id: (3, 1)})
+        cat.delete()
+        self.assertEqual(BreedStats.objects.filter(breed=self.breed_2).values_list('cat_count', 'total_marks',
+                                                                                 'total_votes').get(), (2, 0, 0))
+
+    # Проверка команды пересчета статистики пород
+    def test_reconcile_breed_stats_command(self):
+        BreedStats.objects.filter(breed=self.breed_1).update(cat_count=10, total_votes=3)
+        call_command('reconcile_breed_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(BreedStats.objects.values_list('breed_id', 'cat_count').order_by('breed_id')),
+                         [(self.breed_1.id, 2), (self.breed_2.id, 2), (self.breed_3.id, 0)])
+
+    # Проверка списков питомцев текущего пользователя и указанного владельца с пагинацией
+    def test_owner_cat_lists(self):
+        headers = {'authorization': f'Bearer {self.user_2.data.get("access")}'}
+        response = self.client.get(f'/{self.api_url}cats/mine/', {'page_size': 1}, headers=headers)
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Sandy'])
+        response = self.client.get(response.data['next'], headers=headers)
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Helena'])
+        self.assertIsNone(response.data['next'])
+
+        # Тот же URL другого пользователя не получает чужой ответ из кэша
+        response = self.client.get(f'/{self.api_url}cats/mine/', {'page_size': 1},
+                                   headers={'authorization': f'Bearer {self.user_1.data.get("access")}'})
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Mark'])
+        self.assertEqual(self.client.get(f'/{self.api_url}cats/mine/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.get(f'/{self.api_url}cats/owner/{self.owner_1.id}/', {'ordering': '-id'})
+        self.assertEqual([cat['name'] for cat in response.data['results']], ['Billy', 'Mark'])
+        for owner_id in (0, 2 ** 63, '9' * 40):
+            response = self.client.get(f'/{self.api_url}cats/owner/{owner_id}/')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        plan = Cat.objects.filter(owner_id=self.owner_1.id).order_by('id')[:20].explain()
+        self.assertIn('USING INDEX show_cat_owner_id_idx', plan)
+
+    # Проверка истории голосов питомца и текущего пользователя (новые первыми)
+    def test_vote_history(self):
+        headers = {'authorization': f'Bearer {self.user_1.data.get("access")}'}
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/', {'value': 4}, headers=headers)
+        self.client.post(f'/{self.api_url}voting/{self.cat_1.id}/', {'value': 2},
+                         headers={'authorization': f'Bearer {self.user_2.data.get("access")}'})
+
+        # Проверка питомца, голоса страницы и имена их пользователей, без запросов на каждый голос
+        response = self.assert_query_budget(3, 'get', f'/{self.api_url}cats/{self.cat_1.id}/votes/',
+                                            {'page_size': 1}, headers=headers)
+        self.assertEqual([(vote['value'], vote['username']) for vote in response.data['results']], [(2, 'Petrov')])
+        response = self.client.get(response.data['next'], headers=headers)
+        self.assertEqual([(vote['value'], vote['username']) for vote in response.data['results']], [(4, 'Ivanov')])
+
+        response = self.client.get(f'/{self.api_url}voting/mine/', headers=headers)
+        self.assertEqual([(vote['cat'], vote['value']) for vote in response.data['results']],
+                         [(self.cat_1.id, 4), (self.cat_2.id, 5)])
+        self.assertEqual(self.client.get(f'/{self.api_url}cats/100/votes/', headers=headers).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        plan = Vote.objects.filter(cat_id=self.cat_1.id).order_by('-created_at', '-id')[:20].explain()
+        self.assertIn('USING INDEX show_vote_cat_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    # Проверка сверки рейтингов питомцев по голосам: отчет без исправлений и исправление диапазонами
+    def test_reconcile_ratings_command(self):
+        Cat.objects.filter(id=self.cat_1.id).update(total_marks=7, total_votes=2, rating=3.5)
+        Vote.objects.create(value=3, user=self.owner_2, cat=self.cat_1, is_counted=False)
+        call_command('reconcile_ratings', dry_run=True, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Cat.objects.get(id=self.cat_1.id).total_votes, 2)
+
+        call_command('reconcile_ratings', chunk_size=1, stdout=open(os.devnull, 'w'))
+        cats = {cat.id: cat for cat in Cat.objects.all()}
+        # Неучтенный голос не входит в рейтинг, голос из начальных данных учитывается
+        self.assertEqual((cats[self.cat_1.id].total_marks, cats[self.cat_1.id].total_votes,
+                          cats[self.cat_1.id].rating), (0, 0, 0))
+        self.assertEqual((cats[self.cat_2.id].total_marks, cats[self.cat_2.id].total_votes,
+                          cats[self.cat_2.id].rating), (5, 1, 5))
+        self.assertEqual(BreedStats.objects.get(breed=self.breed_1).total_votes, 1)
+
+        # Диапазоны строятся по фактическим id: пропуск в id не дает пустых диапазонов
+        far_cat = Cat.objects.create(**{**self.cat_data_1, 'id': 10 ** 9})
+        ids = list(Cat.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(chunk_bounds(2), list(zip(ids[::2], [*ids[2::2], None])))
+        Cat.objects.filter(id=far_cat.id).update(total_marks=4, total_votes=1)
+        call_command('reconcile_ratings', chunk_size=2, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Cat.objects.get(id=far_cat.id).total_votes, 0)
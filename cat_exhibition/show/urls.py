@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from .views import CatsViewSet, BreedViewSet, VoteAPIView
+from .views import CatsViewSet, BreedViewSet, VoteAPIView, VoteBatchAPIView, LeaderboardAPIView, \
+    CacheStatsAPIView, ExportAPIView, MyVotesAPIView
 router = routers.DefaultRouter()
 router.register('cats', CatsViewSet, basename='cats',)
 router.register('breeds', BreedViewSet, basename='breeds')
@@ -10,4 +11,9 @@ router.register('breeds', BreedViewSet, basename='breeds')
 urlpatterns = [
     path('', include(router.urls)),
     path('voting/<int:cat_id>/', VoteAPIView.as_view(), name='vote'),
+    path('voting/batch/', VoteBatchAPIView.as_view(), name='vote-batch'),
+    path('voting/mine/', MyVotesAPIView.as_view(), name='vote-mine'),
+    path('leaderboard/', LeaderboardAPIView.as_view(), name='leaderboard'),
+    path('cache-stats/', CacheStatsAPIView.as_view(), name='cache-stats'),
+    path('export/<str:resource>/', ExportAPIView.as_view(), name='export'),
 ]
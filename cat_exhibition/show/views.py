@@ -1,17 +1,90 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import IntegrityError
-from django.http import Http404
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import Cat, Breed, Vote
+from .breed_cache import breed_cache
+from .cache import collection_versions, get_or_build, get_stats, invalidate_cats
+from .conditional import conditional_response
+from .export import EXPORTERS, LAYOUTS, render
+from .fast_serializers import FastCatSerializer, CAT_VALUES
+from .filters import CatFilterSet
+from .models import Cat, Breed, BreedStats, Vote, parse_id
+from .pagination import CatCursorPagination, VoteCursorPagination
+from .search import search_cats, search_terms
 from .serializers import CatSerializer, CatCreationSerializer, BreedSerializer, VoteSerializer, SuccessResponseSerializer, \
-    Error404ResponseSerializer, Error400ResponseSerializer, Error403ResponseSerializer
+    Error404ResponseSerializer, Error400ResponseSerializer, Error403ResponseSerializer, VoteBatchItemSerializer, \
+    VoteBatchResponseSerializer, LeaderboardEntrySerializer, CatBulkItemSerializer, CatBulkErrorResponseSerializer, \
+    CatSearchResponseSerializer, BreedStatsSerializer, VoteHistorySerializer
+from .vote_buffer import vote_buffer
+
+
+# Параметры списков питомцев: фильтры, курсор страницы, размер страницы и сортировка
+CAT_LIST_PARAMETERS = [
+    *CatFilterSet.parameters(),
+    OpenApiParameter(
+        name='cursor',
+        location=OpenApiParameter.QUERY,
+        description='Курсор страницы из ссылок next/previous',
+        required=False,
+        type=str
+    ),
+    OpenApiParameter(
+        name='page_size',
+        location=OpenApiParameter.QUERY,
+        description='Количество питомцев на странице',
+        required=False,
+        type=int
+    ),
+    OpenApiParameter(
+        name='ordering',
+        location=OpenApiParameter.QUERY,
+        description='Сортировка списка',
+        required=False,
+        type=str,
+        enum=list(CatCursorPagination.orderings)
+    ),
+]
+
+
+# Параметры истории голосов: курсор и размер страницы
+VOTE_HISTORY_PARAMETERS = [
+    OpenApiParameter(
+        name='cursor',
+        location=OpenApiParameter.QUERY,
+        description='Курсор страницы из ссылок next/previous',
+        required=False,
+        type=str
+    ),
+    OpenApiParameter(
+        name='page_size',
+        location=OpenApiParameter.QUERY,
+        description='Количество голосов на странице',
+        required=False,
+        type=int
+    ),
+]
+
+
+# Страница истории голосов, новые первыми. Имена пользователей страницы загружаются отдельным запросом
+# по первичному ключу, а не соединением, чтобы выборка голосов всегда шла по индексу с created_at
+def vote_history(request, queryset, view):
+    paginator = VoteCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    usernames = dict(User.objects.filter(id__in={vote.user_id for vote in page}).values_list('id', 'username'))
+    serializer = VoteHistorySerializer(page, many=True, context={'usernames': usernames})
+    return paginator.get_paginated_response(serializer.data)
 
 
 # Операции с животными
@@ -19,33 +92,92 @@ from .serializers import CatSerializer, CatCreationSerializer, BreedSerializer,
 class CatsViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    # Получение всех питомцев/ питомцев с указанным id породы в query параметрах
+    # Получение всех питомцев/ питомцев, отобранных фильтрами CatFilterSet в query параметрах,
+    # постранично с курсорной пагинацией
     @extend_schema(summary='Cats data list getting',
                    responses={
                        status.HTTP_200_OK: OpenApiResponse(
-                           response=CatSerializer,
+                           response=CatSerializer(many=True),
                            description='Получение списка питомцев'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=Error400ResponseSerializer,
+                           description='Некорректное значение фильтра'),
+                   },
+                   parameters=CAT_LIST_PARAMETERS
+                   )
+    def list(self, request):
+        return self._cat_list(request, Cat.objects.all(), 'cats-list')
+
+    # Питомцы текущего пользователя постранично. Выбираются по индексу (owner, id),
+    # поэтому время ответа зависит от количества его питомцев, а не от размера таблицы
+    @extend_schema(summary='Current user cats list getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=CatSerializer(many=True),
+                           description='Получение списка питомцев текущего пользователя'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=Error400ResponseSerializer,
+                           description='Некорректное значение фильтра'),
+                   },
+                   parameters=CAT_LIST_PARAMETERS
+                   )
+    @action(detail=False, methods=['get'], url_path='mine', permission_classes=[IsAuthenticated])
+    def mine(self, request):
+        return self._cat_list(request, Cat.objects.filter(owner_id=request.user.id), 'cats-mine',
+                              vary=str(request.user.id))
+
+    # Питомцы владельца с указанным id постранично
+    @extend_schema(summary='Owner cats list getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=CatSerializer(many=True),
+                           description='Получение списка питомцев владельца'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=Error400ResponseSerializer,
+                           description='Некорректное значение фильтра'),
+                       status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                           response=Error404ResponseSerializer,
+                           description='Id владельца вне допустимого диапазона'),
                    },
                    parameters=[
                        OpenApiParameter(
-                           name='breed_id',
-                           location=OpenApiParameter.QUERY,
-                           description='Id породы для фильтрации запроса',
-                           required=False,
-                           type=int
-                       ),
+                           name='owner_id',
+                           location=OpenApiParameter.PATH,
+                           description='Id владельца',
+                           required=True,
+                           type=int),
+                       *CAT_LIST_PARAMETERS,
                    ]
                    )
-    def list(self, request):
-        breed = request.query_params.get('breed_id', None)
-        if breed:
-            cat = Cat.objects.filter(breed_id=breed)
-            serializer = CatSerializer(cat, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    @action(detail=False, methods=['get'], url_path=r'owner/(?P<owner_id>\d+)')
+    def owner(self, request, owner_id: int = None):
+        # Id вне диапазона столбца не может принадлежать владельцу и переполнил бы драйвер БД
+        try:
+            owner_id = parse_id(owner_id)
+        except ValueError:
+            raise Http404({'error': f'Владелец с указанным id={owner_id} не найден.'})
+        return self._cat_list(request, Cat.objects.filter(owner_id=owner_id), 'cats-owner')
 
-        queryset = Cat.objects.all()
-        serializer = CatSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    # Страница питомцев queryset с фильтрами из query параметров, условным GET и кэшем ответов
+    def _cat_list(self, request, queryset, endpoint: str, vary: str = ''):
+        try:
+            queryset = CatFilterSet.apply(queryset, request.query_params)
+        except ValueError as error:
+            return Response({'error': f'Некорректное значение фильтра {error}'}, status=status.HTTP_400_BAD_REQUEST)
+        # Ответ зависит от пользователя (vary), поэтому он входит и в ETag
+        versions = [*collection_versions(['cats', 'breeds']), {'vary': vary}]
+        return conditional_response(request, versions, lambda: Response(
+            get_or_build(request, endpoint, ['cats', 'breeds'], 'cats', lambda: self._list_data(request, queryset),
+                         vary=vary),
+            status=status.HTTP_200_OK))
+
+    def _list_data(self, request, queryset):
+        # Список только для чтения строится быстрым сериализатором из строк .values()
+        queryset = queryset.values(*CAT_VALUES)
+        paginator = CatCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        data = FastCatSerializer(breed_cache.get()).many(page)
+        return paginator.get_paginated_response(data).data
 
     # Получение питомца с указанным id в url
     @extend_schema(summary='Definite cat data getting',
@@ -67,13 +199,119 @@ class CatsViewSet(viewsets.ViewSet):
                    ]
                    )
     def retrieve(self, request, pk: int = None):
+        # Ключ кэша и инвалидация используют числовой id, поэтому /cats/01/ и /cats/1/ - один питомец
         try:
-            cat = Cat.objects.get(id=pk)
-            serializer = CatSerializer(cat)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            pk = parse_id(pk)
+        except ValueError:
+            raise Http404({'error': f'Животное с указанным id={pk} не найдено.'})
+        # Версии питомца и его породы одним легким запросом для ответа 304 без сериализации
+        version = Cat.objects.filter(id=pk).values('version', 'updated_at',
+                                                   'breed__version', 'breed__updated_at').first()
+        if version is None:
+            raise Http404({'error': f'Животное с указанным id={pk} не найдено.'})
+        versions = [{'version': version['version'], 'updated_at': version['updated_at']},
+                    {'version': version['breed__version'], 'updated_at': version['breed__updated_at']}]
+        return conditional_response(request, versions, lambda: Response(
+            get_or_build(request, 'cats-retrieve', [f'cat:{pk}', 'breeds'], 'cats', lambda: self._retrieve_data(pk)),
+            status=status.HTTP_200_OK))
+
+    def _retrieve_data(self, pk):
+        try:
+            cat = Cat.objects.select_related('owner').get(id=pk)
+            serializer = CatSerializer(cat, context={'breeds': breed_cache.get()})
+            return serializer.data
         except ObjectDoesNotExist:
             raise Http404({'error': f'Животное с указанным id={pk} не найдено.'})
 
+    # Полнотекстовый поиск питомцев по кличке, описанию, окрасу и названию породы.
+    # Слова ищутся по началу, результаты отсортированы по релевантности и выдаются постранично (limit/ offset)
+    @extend_schema(summary='Cats searching',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=CatSearchResponseSerializer,
+                           description='Найденные питомцы в порядке релевантности'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=Error400ResponseSerializer,
+                           description='Введенные данные некорректны'),
+                   },
+                   parameters=[
+                       OpenApiParameter(
+                           name='q',
+                           location=OpenApiParameter.QUERY,
+                           description='Поисковый запрос',
+                           required=True,
+                           type=str
+                       ),
+                       OpenApiParameter(
+                           name='limit',
+                           location=OpenApiParameter.QUERY,
+                           description='Количество питомцев на странице',
+                           required=False,
+                           type=int
+                       ),
+                       OpenApiParameter(
+                           name='offset',
+                           location=OpenApiParameter.QUERY,
+                           description='Количество пропускаемых питомцев',
+                           required=False,
+                           type=int
+                       ),
+                   ]
+                   )
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', settings.CATS_PAGE_SIZE))
+            offset = int(request.query_params.get('offset', 0))
+            if not search_terms(query) or limit < 1 or offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'Передайте поисковый запрос q и корректные limit и offset'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, settings.CATS_MAX_PAGE_SIZE)
+        return Response(get_or_build(request, 'cats-search', ['cats', 'breeds'], 'cats',
+                                     lambda: self._search_data(request, query, limit, offset)),
+                        status=status.HTTP_200_OK)
+
+    def _search_data(self, request, query, limit, offset):
+        count, ids = search_cats(query, limit, offset)
+        rows = {row['id']: row for row in Cat.objects.filter(id__in=ids).values(*CAT_VALUES)}
+        serializer = FastCatSerializer(breed_cache.get())
+        url = request.build_absolute_uri()
+        return {
+            'count': count,
+            'next': replace_query_param(url, 'offset', offset + limit) if offset + limit < count else None,
+            'previous': replace_query_param(url, 'offset', max(offset - limit, 0)) if offset else None,
+            'results': [serializer.to_representation(rows[cat_id]) for cat_id in ids if cat_id in rows],
+        }
+
+    # История голосов за питомца, новые первыми
+    @extend_schema(summary='Cat votes history getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=VoteHistorySerializer(many=True),
+                           description='Получение голосов за питомца'),
+                       status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                           response=Error404ResponseSerializer,
+                           description='Указанный питомец не найден'),
+                   },
+                   parameters=[
+                       OpenApiParameter(
+                           name='id',
+                           location=OpenApiParameter.PATH,
+                           description='Id питомца',
+                           required=True,
+                           type=int),
+                       *VOTE_HISTORY_PARAMETERS,
+                   ]
+                   )
+    @action(detail=True, methods=['get'], url_path='votes', permission_classes=[IsAuthenticated])
+    def votes(self, request, pk: int = None):
+        if not Cat.objects.filter(id=pk).exists():
+            raise Http404({'error': f'Животное с указанным id={pk} не найдено.'})
+        return vote_history(request, Vote.objects.filter(cat_id=pk), self)
+
     # Добавление питомца
     @extend_schema(summary='Cat data adding',
                    request=CatCreationSerializer,
@@ -87,16 +325,57 @@ class CatsViewSet(viewsets.ViewSet):
                    },
                    )
     def create(self, request):
-        cat_data = request.data.copy()
-        user = User.objects.get(id=request.user.id)
-        cat_data['owner'] = user.id
-        serializer = CatSerializer(data=cat_data)
+        serializer = CatSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(owner=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
             return Response({'error': 'Передайте все данные о питомце'}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Массовое добавление питомцев (например, целого помета) одним запросом.
+    # Все питомцы проверяются вместе, породы проверяются одним запросом,
+    # питомцы добавляются одним bulk_create в транзакции: либо все, либо ни одного
+    @extend_schema(summary='Cats data bulk adding',
+                   request=CatCreationSerializer(many=True),
+                   responses={
+                       status.HTTP_201_CREATED: OpenApiResponse(
+                           response=CatSerializer(many=True),
+                           description='Добавление данных о питомцах'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=CatBulkErrorResponseSerializer,
+                           description='Ошибки в данных каждого питомца'),
+                   },
+                   )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        items = request.data if isinstance(request.data, list) else []
+        breed_ids = set()
+        for item in items:
+            # Некорректные id пород не запрашиваются, их отклонит проверка сериализатора
+            try:
+                breed_ids.add(parse_id(item.get('breed')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        breeds = {breed.id: BreedSerializer(breed).data for breed in Breed.objects.filter(id__in=breed_ids)}
+
+        serializer = CatBulkItemSerializer(data=request.data, many=True, allow_empty=False,
+                                           max_length=settings.CATS_BULK_MAX_SIZE, context={'breeds': breeds})
+        if not serializer.is_valid():
+            results = serializer.errors if isinstance(serializer.errors, list) else []
+            return Response({'error': f'Передайте от 1 до {settings.CATS_BULK_MAX_SIZE} питомцев со всеми данными',
+                             'results': results},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        cats = [Cat(owner=request.user, breed_id=item.pop('breed'), **item) for item in serializer.validated_data]
+        litters = Counter(cat.breed_id for cat in cats)
+        with transaction.atomic():
+            Cat.objects.bulk_create(cats)
+            # bulk_create не вызывает сигналы, статистика пород изменяется одним запросом на весь пакет
+            BreedStats.objects.apply_deltas({breed_id: (count, 0, 0) for breed_id, count in litters.items()})
+            invalidate_cats([cat.id for cat in cats])
+        return Response(CatSerializer(cats, many=True, context={'breeds': breeds}).data,
+                        status=status.HTTP_201_CREATED)
+
     # Изменение данных питомца с проверкой на принадлежность
     @extend_schema(summary='Cat data changing',
                    request=CatCreationSerializer,
@@ -127,14 +406,12 @@ class CatsViewSet(viewsets.ViewSet):
         try:
             cat = Cat.objects.get(id=pk)
             # Проверка на принадлежность питомца создателю запроса
-            if cat.owner.id != request.user.id:
+            if cat.owner_id != request.user.id:
                 return Response('У Вас нет прав изменять эти данные. Животное принадлежит не Вам.',
                                 status=status.HTTP_403_FORBIDDEN)
-            cat_data = request.data.copy()
-            cat_data['owner'] = request.user.id
-            serializer = CatSerializer(instance=cat, data=cat_data)
+            serializer = CatSerializer(instance=cat, data=request.data)
             if serializer.is_valid():
-                serializer.save()
+                serializer.save(owner=request.user)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             else:
                 return Response({'error': 'Передайте все данные о питомце'}, status=status.HTTP_400_BAD_REQUEST)
@@ -168,7 +445,7 @@ class CatsViewSet(viewsets.ViewSet):
         try:
             cat = Cat.objects.get(id=pk)
             # Проверка на принадлежность питомца создателю запроса
-            if cat.owner.id != request.user.id:
+            if cat.owner_id != request.user.id:
                 return Response({'error': 'У Вас нет прав удалять эти данные. Животное принадлежит не Вам.'},
                                 status=status.HTTP_403_FORBIDDEN)
             cat.delete()
@@ -193,9 +470,8 @@ class BreedViewSet(viewsets.ViewSet):
                    },
                    )
     def list(self, request):
-        queryset = Breed.objects.all()
-        serializer = BreedSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return conditional_response(request, collection_versions(['breeds']), lambda: Response(
+            list(breed_cache.get().values()), status=status.HTTP_200_OK))
 
     # Добавление пород
     @extend_schema(summary='Breed data adding',
@@ -217,6 +493,171 @@ class BreedViewSet(viewsets.ViewSet):
         else:
             return Response({'error': 'Передайте все данные о породе'}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Статистика всех пород: количество питомцев, голосов и средняя оценка.
+    # Читается из поддерживаемой при изменениях таблицы, без обхода питомцев
+    @extend_schema(summary='Breed statistics getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=BreedStatsSerializer(many=True),
+                           description='Получение статистики пород'),
+                   },
+                   )
+    @action(detail=False, methods=['get'], url_path='stats')
+    def stats(self, request):
+        queryset = BreedStats.objects.select_related('breed').order_by('breed_id')
+        return Response(get_or_build(request, 'breed-stats', ['cats', 'breeds'], 'breeds',
+                                     lambda: BreedStatsSerializer(queryset, many=True).data),
+                        status=status.HTTP_200_OK)
+
+
+# Таблица лидеров выставки
+@extend_schema(tags=['Cats'])
+class LeaderboardAPIView(APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    # Сортировки таблицы лидеров. Каждой соответствует составной индекс,
+    # поэтому первые limit питомцев читаются из индекса без сканирования таблицы
+    orderings = {
+        'rating': ('-rating', '-total_votes', '-id'),
+        'score': ('-score', '-total_votes', '-id'),
+    }
+
+    # Получение лучших питомцев выставки/ породы с указанным id в query параметрах
+    @extend_schema(summary='Cats leaderboard getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=LeaderboardEntrySerializer(many=True),
+                           description='Получение лучших питомцев с их местами'),
+                       status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                           response=Error400ResponseSerializer,
+                           description='Введенные данные некорректны'),
+                   },
+                   parameters=[
+                       OpenApiParameter(
+                           name='breed_id',
+                           location=OpenApiParameter.QUERY,
+                           description='Id породы для фильтрации запроса',
+                           required=False,
+                           type=int
+                       ),
+                       OpenApiParameter(
+                           name='limit',
+                           location=OpenApiParameter.QUERY,
+                           description='Количество питомцев в таблице',
+                           required=False,
+                           type=int
+                       ),
+                       OpenApiParameter(
+                           name='by',
+                           location=OpenApiParameter.QUERY,
+                           description='rating - средняя оценка, score - взвешенный рейтинг',
+                           required=False,
+                           type=str,
+                           enum=['rating', 'score']
+                       ),
+                   ]
+                   )
+    def get(self, request):
+        by = request.query_params.get('by', 'rating')
+        breed = request.query_params.get('breed_id', None)
+        try:
+            limit = int(request.query_params.get('limit', settings.LEADERBOARD['DEFAULT_LIMIT']))
+            if by not in self.orderings or limit < 1:
+                raise ValueError
+            breed = int(breed) if breed else None
+        except ValueError:
+            return Response({'error': 'Передайте корректные limit, by и breed_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, settings.LEADERBOARD['MAX_LIMIT'])
+
+        queryset = Cat.objects.all()
+        if breed is not None:
+            queryset = queryset.filter(breed_id=breed)
+
+        return conditional_response(request, collection_versions(['cats', 'breeds']), lambda: Response(
+            get_or_build(request, 'leaderboard', ['cats', 'breeds'], 'cats',
+                         lambda: self._leaderboard_data(queryset, by, limit)),
+            status=status.HTTP_200_OK))
+
+    def _leaderboard_data(self, queryset, by, limit):
+        queryset = queryset.order_by(*self.orderings[by]).values(*CAT_VALUES)
+        cats = list(queryset[:limit])
+
+        # Питомцы с одинаковыми значениями сортировки делят одно место
+        previous = None
+        for position, cat in enumerate(cats, start=1):
+            key = (cat[by], cat['total_votes'])
+            if key != previous:
+                rank = position
+                previous = key
+            cat['rank'] = rank
+        return FastCatSerializer(breed_cache.get(), LeaderboardEntrySerializer).many(cats)
+
+
+# Потоковая выгрузка всех питомцев или всей истории голосов для аналитики
+@extend_schema(tags=['Export'])
+class ExportAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    # Выгрузка формируется по мере чтения из БД и не собирается целиком в памяти
+    @extend_schema(summary='Cats/ votes data export',
+                   responses={
+                       (status.HTTP_200_OK, 'application/x-ndjson'): OpenApiResponse(
+                           description='Записи в формате JSON Lines или JSON массив'),
+                       status.HTTP_403_FORBIDDEN: OpenApiResponse(
+                           response=Error403ResponseSerializer,
+                           description='Отсутствуют права на данную операцию'),
+                       status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                           response=Error404ResponseSerializer,
+                           description='Неизвестные данные для выгрузки'),
+                   },
+                   parameters=[
+                       OpenApiParameter(
+                           name='resource',
+                           location=OpenApiParameter.PATH,
+                           description='Выгружаемые данные',
+                           required=True,
+                           type=str,
+                           enum=list(EXPORTERS)),
+                       OpenApiParameter(
+                           name='layout',
+                           location=OpenApiParameter.QUERY,
+                           description='jsonl - JSON Lines (по умолчанию), json - JSON массив',
+                           required=False,
+                           type=str,
+                           enum=list(LAYOUTS)),
+                   ]
+                   )
+    def get(self, request, resource: str = None):
+        layout = request.query_params.get('layout', 'jsonl')
+        if resource not in EXPORTERS:
+            return Response({'error': f'Выгрузка {resource} не поддерживается.'},
+                            status=status.HTTP_404_NOT_FOUND)
+        if layout not in LAYOUTS:
+            return Response({'error': 'Формат выгрузки должен быть jsonl или json.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(render(EXPORTERS[resource](), layout), content_type=LAYOUTS[layout])
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{layout}"'
+        return response
+
+
+# Статистика кэша ответов для мониторинга
+@extend_schema(tags=['Monitoring'])
+class CacheStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    # Получение количества попаданий и промахов кэша по endpoint в текущем процессе
+    @extend_schema(summary='Response cache statistics getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           description='Попадания, промахи и доля попаданий кэша по endpoint'),
+                       status.HTTP_403_FORBIDDEN: OpenApiResponse(
+                           response=Error403ResponseSerializer,
+                           description='Отсутствуют права на данную операцию'),
+                   },
+                   )
+    def get(self, request):
+        return Response(get_stats(), status=status.HTTP_200_OK)
+
 
 # Выставление оценок котенку
 @extend_schema(tags=['Votes'])
@@ -244,21 +685,29 @@ class VoteAPIView(APIView):
     )
 
     def post(self, request, cat_id: int =None):
-        mark = int(request.data.get('value'))
         try:
             serializer = VoteSerializer(data=request.data)
             if not serializer.is_valid():
                 raise ValidationError
-            user = User.objects.get(pk=request.user.id)
-            cat = Cat.objects.get(pk=cat_id)
-            Vote.objects.create(user=user,
-                                cat=cat,
-                                value=mark)
-            # Расчет нового рейтинга питомца
-            cat.total_votes += 1
-            cat.total_marks += mark
-            cat.rating = cat.total_marks / cat.total_votes
-            cat.save()
+            mark = serializer.validated_data['value']
+            if settings.VOTES_WRITE_BEHIND['ENABLED']:
+                # Отложенный пересчет: сохраняется только голос, рейтинг пересчитает накопитель голосов
+                if not Cat.objects.filter(pk=cat_id).exists():
+                    raise ObjectDoesNotExist
+                Vote.objects.create(user=request.user,
+                                    cat_id=cat_id,
+                                    value=mark,
+                                    is_counted=False)
+                vote_buffer.add()
+            else:
+                # Голос и пересчет рейтинга питомца в одной транзакции. Сначала обновляется строка питомца,
+                # что блокирует ее до конца транзакции и сразу показывает, существует ли питомец
+                with transaction.atomic():
+                    if not Cat.objects.apply_vote_deltas({cat_id: (mark, 1)}):
+                        raise ObjectDoesNotExist
+                    Vote.objects.create(user=request.user,
+                                        cat_id=cat_id,
+                                        value=mark)
             return Response({'message': f'Вы успешно поставили {mark} питомцу с id={cat_id}'},
                             status=status.HTTP_200_OK)
         except ValidationError:
@@ -270,3 +719,153 @@ class VoteAPIView(APIView):
         except IntegrityError:
             return Response({'error': f'Вы уже голосовали за питомца с id={cat_id}.'},
                             status=status.HTTP_409_CONFLICT)
+
+    # Изменение оценки питомцу
+    @extend_schema(
+        summary='Change cat valuation',
+        request=VoteSerializer,
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=SuccessResponseSerializer,
+                description='Оценка изменена'),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                response=Error403ResponseSerializer,
+                description='Неверная оценка'),
+            status.HTTP_409_CONFLICT: OpenApiResponse(
+                response=Error403ResponseSerializer,
+                description='Голос изменен параллельным запросом'),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                response=Error404ResponseSerializer,
+                description='Голос не найден'),
+        },
+    )
+    def put(self, request, cat_id: int = None):
+        serializer = VoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': 'Не удалось оценить питомца.Оценка должна быть от 0 до 5.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        mark = serializer.validated_data['value']
+        return self.change_vote(request, cat_id, mark,
+                                lambda votes: votes.update(value=mark),
+                                f'Вы успешно изменили оценку питомцу с id={cat_id} на {mark}')
+
+    # Отзыв оценки питомцу
+    @extend_schema(
+        summary='Withdraw cat valuation',
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=SuccessResponseSerializer,
+                description='Оценка отозвана'),
+            status.HTTP_409_CONFLICT: OpenApiResponse(
+                response=Error403ResponseSerializer,
+                description='Голос изменен параллельным запросом'),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                response=Error404ResponseSerializer,
+                description='Голос не найден'),
+        },
+    )
+    def delete(self, request, cat_id: int = None):
+        return self.change_vote(request, cat_id, None,
+                                lambda votes: votes.delete()[0],
+                                f'Вы успешно отозвали оценку питомцу с id={cat_id}')
+
+    # Изменение (mark - новая оценка) или удаление (mark=None) голоса пользователя с поправкой рейтинга
+    # питомца на разницу одним UPDATE запросом, без пересчета по всем голосам. Голос меняется условным
+    # запросом по прочитанным значению и признаку учета: если параллельный запрос или накопитель голосов
+    # успел его изменить, ничего не меняется и возвращается 409. Неучтенный голос (отложенный пересчет)
+    # еще не входит в рейтинг, поэтому меняется только сам голос
+    @staticmethod
+    def change_vote(request, cat_id: int, mark, write, message: str):
+        vote = Vote.objects.filter(user=request.user, cat_id=cat_id).values('id', 'value', 'is_counted').first()
+        if vote is None:
+            return Response({'error': f'Вы не голосовали за питомца с id={cat_id}.'},
+                            status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            if not write(Vote.objects.filter(**vote)):
+                return Response({'error': f'Голос за питомца с id={cat_id} изменен параллельным запросом.'},
+                                status=status.HTTP_409_CONFLICT)
+            if vote['is_counted'] and mark != vote['value']:
+                delta = (-vote['value'], -1) if mark is None else (mark - vote['value'], 0)
+                Cat.objects.apply_vote_deltas({cat_id: delta})
+        return Response({'message': message}, status=status.HTTP_200_OK)
+
+
+# Выставление оценок сразу нескольким питомцам
+@extend_schema(tags=['Votes'])
+class VoteBatchAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Пакетное голосование: проверка всех оценок двумя запросами, вставка одним bulk_create
+    # и пересчет рейтингов всех питомцев одним UPDATE запросом
+    @extend_schema(
+        summary='Cats batch valuation',
+        request=VoteBatchItemSerializer(many=True),
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=VoteBatchResponseSerializer,
+                description='Результат голосования по каждому питомцу'),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                response=Error400ResponseSerializer,
+                description='Неверные оценки'),
+            status.HTTP_409_CONFLICT: OpenApiResponse(
+                response=Error403ResponseSerializer,
+                description='Оценки были изменены параллельным запросом'),
+        },
+    )
+    def post(self, request):
+        serializer = VoteBatchItemSerializer(data=request.data, many=True, allow_empty=False,
+                                             max_length=settings.VOTES_BATCH_MAX_SIZE)
+        if not serializer.is_valid():
+            return Response({'error': f'Передайте от 1 до {settings.VOTES_BATCH_MAX_SIZE} оценок от 0 до 5.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data
+        cat_ids = {item['cat_id'] for item in items}
+        existing = set(Cat.objects.filter(id__in=cat_ids).values_list('id', flat=True))
+        voted = set(Vote.objects.filter(user=request.user, cat_id__in=cat_ids).values_list('cat_id', flat=True))
+
+        results = []
+        votes = []
+        deltas = {}
+        for item in items:
+            cat_id, mark = item['cat_id'], item['value']
+            if cat_id not in existing:
+                result_status = status.HTTP_404_NOT_FOUND
+            elif cat_id in voted:
+                # Повторная оценка питомца, в том числе внутри одного пакета
+                result_status = status.HTTP_409_CONFLICT
+            else:
+                votes.append(Vote(user=request.user, cat_id=cat_id, value=mark))
+                deltas[cat_id] = (mark, 1)
+                voted.add(cat_id)
+                result_status = status.HTTP_201_CREATED
+            results.append({'cat_id': cat_id, 'value': mark, 'status': result_status})
+
+        try:
+            with transaction.atomic():
+                Vote.objects.bulk_create(votes)
+                Cat.objects.apply_vote_deltas(deltas)
+        except IntegrityError:
+            return Response({'error': 'Оценки были изменены параллельным запросом. Повторите голосование.'},
+                            status=status.HTTP_409_CONFLICT)
+
+        return Response({'message': f'Учтено оценок: {len(votes)} из {len(items)}', 'results': results},
+                        status=status.HTTP_200_OK)
+
+
+# История голосов текущего пользователя
+@extend_schema(tags=['Votes'])
+class MyVotesAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Получение оценок, выставленных текущим пользователем, новые первыми
+    @extend_schema(summary='Current user votes history getting',
+                   responses={
+                       status.HTTP_200_OK: OpenApiResponse(
+                           response=VoteHistorySerializer(many=True),
+                           description='Получение голосов текущего пользователя'),
+                   },
+                   parameters=VOTE_HISTORY_PARAMETERS
+                   )
+    def get(self, request):
+        return vote_history(request, Vote.objects.filter(user_id=request.user.id), self)
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction, connections
+
+from .models import Cat, Vote
+
+logger = logging.getLogger(__name__)
+
+
+# Перенос неучтенных голосов в рейтинги питомцев.
+# Голоса сначала помечаются учтенными, затем их оценки суммируются по питомцам
+# и применяются одним UPDATE запросом. Если часть голосов уже забрал параллельный перенос,
+# транзакция откатывается, и эти голоса будут учтены следующим переносом
+def flush_pending_votes() -> int:
+    batch_size = settings.VOTES_WRITE_BEHIND['FLUSH_BATCH_SIZE']
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            pending = list(Vote.objects.select_for_update()
+                           .filter(is_counted=False)
+                           .order_by('id')
+                           .values_list('id', 'cat_id', 'value')[:batch_size])
+            if not pending:
+                return flushed
+            ids = [vote_id for vote_id, _, _ in pending]
+            if Vote.objects.filter(id__in=ids, is_counted=False).update(is_counted=True) != len(ids):
+                transaction.set_rollback(True)
+                return flushed
+
+            deltas = {}
+            for _, cat_id, value in pending:
+                marks, votes = deltas.get(cat_id, (0, 0))
+                deltas[cat_id] = (marks + value, votes + 1)
+            Cat.objects.apply_vote_deltas(deltas)
+        flushed += len(pending)
+
+
+# Накопитель голосов процесса: запускает перенос неучтенных голосов
+# после FLUSH_SIZE голосов или через FLUSH_INTERVAL_MS после первого неучтенного голоса
+class VoteBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer = None
+        self._registered = False
+
+    def add(self, count: int = 1):
+        config = settings.VOTES_WRITE_BEHIND
+        with self._lock:
+            if not self._registered:
+                # Перенос оставшихся голосов при остановке процесса
+                atexit.register(self._flush_on_exit)
+                self._registered = True
+            self._pending += count
+            flush_now = self._pending >= config['FLUSH_SIZE']
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(config['FLUSH_INTERVAL_MS'] / 1000, self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            self._pending = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            return flush_pending_votes()
+        except Exception:
+            logger.exception('Не удалось перенести голоса в рейтинги питомцев')
+            return 0
+
+    def _flush_on_exit(self):
+        if self._pending:
+            self.flush()
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            # Поток таймера открывает собственное соединение с БД
+            connections.close_all()
+
+
+vote_buffer = VoteBuffer()